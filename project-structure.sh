@@ -7,6 +7,22 @@ cv_analyzer/
 │   ├── main.py           # Main application entry point
 │   ├── config.py         # Configuration and constants
 │   ├── agents.py         # CrewAI agents definition
+│   ├── llm.py            # Pooled LLM client
 │   ├── tasks.py          # CrewAI tasks definition
+│   ├── prompts.py        # Prompt token counting and budgets
 │   ├── ui.py             # Streamlit UI components
-│   └── utils.py          # Helper functions
+│   ├── utils.py          # Helper functions
+│   ├── documents.py      # Per-session in-memory upload store
+│   ├── extraction.py     # Parallel page extraction and layout sectioning
+│   ├── index_cache.py    # Persistent PDF embedding index cache
+│   ├── result_cache.py   # Analysis result cache
+│   ├── candidates.py     # Candidate store with per-requirement verdicts
+│   ├── pipeline.py       # End-to-end analysis pipeline
+│   ├── scheduler.py      # Concurrent crew task scheduling
+│   ├── language.py       # Offline language detection
+│   ├── streaming.py      # Token streaming bridge to the UI
+│   ├── jobs.py           # Background analysis job queue
+│   ├── metrics.py        # Per-stage spans and metrics export
+│   ├── vacancy.py        # Requirement index and vector pre-ranking
+│   ├── batch.py          # Headless batch screening CLI
+│   └── benchmark.py      # Offline benchmark suite with a stub LLM server
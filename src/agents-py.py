@@ -2,70 +2,109 @@
 CrewAI agents and crew configuration for CV analysis.
 """
 
+import time
+import queue
 import logging
-from typing import Tuple
+from typing import Any, Callable, Optional, Tuple
 
-from langchain_openai import ChatOpenAI
-from crewai_tools import PDFSearchTool
 from crewai import Agent, Crew, Process
 
-from config import OPENAI_API_KEY, OPENAI_MODEL_NAME
-from tasks import create_analysis_task, create_translator_task, create_evaluation_task
+import metrics
+from config import CREW_PROCESS, DIRECT_ANALYSIS_MAX_ITER, METRICS_ENABLED
+from llm import MetricsCallbackHandler, get_agent_llm, get_llm
+from streaming import QueueCallbackHandler, make_step_callback, make_task_callback, step_tools
+from tasks import (
+    create_analysis_task,
+    create_direct_analysis_task,
+    create_criteria_task,
+    create_translator_task,
+    create_evaluation_task,
+)
+from index_cache import get_pdf_tool
+from scheduler import schedule_concurrent_tasks
 
-def create_agents(pdf_tool) -> Tuple[Agent, Agent, Agent]:
+# Bump whenever the prompts below change so cached results are invalidated
+PROMPT_VERSION = "2"
+
+# Agent templates are built once; only the LLM client, the PDF tool and
+# the delegation flag are bound per request. The requirements, the CV text
+# and the output instructions live in the tasks, so each prompt carries them
+# once instead of repeating them in the goal and backstory
+
+ANALYST_BACKSTORY = (
+    """Eres un agente especializado en la selección de candidatos con perfiles técnicos. Analizas en profundidad las habilidades, experiencia y formación de una hoja de vida y las comparas con los requisitos de un puesto, identificando de forma explícita y precisa coincidencias y brechas."""
+)
+
+# Analyst that searches the CV with the PDF tool
+ANALYST_TEMPLATE = dict(
+    role="Analista de CV",
+    goal="""Determinar, criterio por criterio, si la hoja de vida del candidato cumple con los requisitos del puesto, consultando su contenido con la tool de búsqueda de texto (pdf_tool).""",
+    backstory=ANALYST_BACKSTORY,
+    verbose=True,
+    max_iter=30,
+)
+
+# Direct mode analyst: the CV text is part of the task, so there is no tool loop
+DIRECT_ANALYST_TEMPLATE = dict(
+    role="Analista de CV",
+    goal="""Determinar, criterio por criterio, si la hoja de vida proporcionada en la tarea cumple con los requisitos del puesto.""",
+    backstory=ANALYST_BACKSTORY,
+    verbose=True,
+    max_iter=DIRECT_ANALYSIS_MAX_ITER,
+    allow_delegation=False,
+)
+
+# Translator
+TRANSLATOR_TEMPLATE = dict(
+    role="Traductor",
+    goal="""Traducir con precisión al español cualquier texto proporcionado, devolviéndolo sin cambios si ya está en español.""",
+    backstory=(
+        """Eres un traductor experto que conserva el contexto, el significado y el tono del texto original."""),
+    verbose=True,
+    max_iter=10,
+    allow_delegation=False,
+)
+
+# Evaluator
+EVALUATOR_TEMPLATE = dict(
+    role="Evaluador de selección",
+    goal="""Decidir si el candidato cumple o no con los requisitos básicos del puesto a partir del análisis de su hoja de vida.""",
+    backstory=(
+        """Eres un evaluador de selección: no repites el análisis detallado, solo verificas si el perfil del candidato se ajusta de manera general al puesto y justificas tu decisión de forma clara y concisa."""),
+    verbose=False,
+    max_iter=10,
+    allow_delegation=False,
+)
+
+def create_agents(pdf_tool, allow_delegation: bool = True,
+                  llm_factory: Optional[Callable[[str], Any]] = None) -> Tuple[Agent, Agent, Agent]:
     """
     Create and configure the CrewAI agents.
     
     Args:
-        pdf_tool: PDFSearchTool instance for document analysis
+        pdf_tool: PDFSearchTool instance for document analysis, or None to
+            create an analyst that reads the CV text injected in its task
+        allow_delegation: Whether the analyst may delegate to the translator
+        llm_factory: Optional callable returning the LLM for an agent role;
+            defaults to the shared, pooled LLM client
         
     Returns:
         Tuple of analyst, translator, and evaluator agents
     """
     try:
-        # Initialize LLM
-        llm = ChatOpenAI(
-            model_name=OPENAI_MODEL_NAME, 
-            temperature=0.7, 
-            api_key=OPENAI_API_KEY
-        )
+        # Shared, pooled LLM client unless a per-agent factory is given
+        llm_for = llm_factory or (lambda role: get_llm())
         
         # Create Analyst Agent
-        analyst = Agent(
-            role="Analista de CV",
-            goal="""Identificar candidatos con perfiles que se ajusten óptimamente a los requisitos detallados para el puesto {descripcion}, evaluando cada elemento de la hoja de vida proporcionada para determinar si cumple o no con los criterios específicos. Debes usar la tool de búsqueda de texto (pdf_tool) para analizar el contenido de la hoja de vida. Si el contenido de la hoja de vida o los requisitos del perfil están en otro idioma diferente al español, delega al agente traductor para traducirlos antes de proceder con el análisis. """,
-            tools=[pdf_tool],
-            verbose=True,
-            backstory=(
-                """Eres un agente especializado en la selección de candidatos con perfiles técnicos. Tu objetivo es analizar en profundidad las habilidades, experiencia y formación presentadas en la hoja de vida y compararlas con los requisitos específicos de la posición {descripcion}. Antes de iniciar el análisis, verifica si la hoja de vida y los requisitos están en español. Si no, delega la tarea al agente traductor para convertir el contenido al español. Debes identificar coincidencias y brechas de manera precisa, resaltando de forma explícita y detallada las áreas donde el candidato cumple o no cumple con las expectativas. Debes usar la tool de búsqueda de texto para analizar el contenido de la hoja de vida."""),
-            llm=llm,
-            max_iter=30,
-            allow_delegation=True,
-        )
+        if pdf_tool is not None:
+            analyst = Agent(**ANALYST_TEMPLATE, tools=[pdf_tool], llm=llm_for(ANALYST_TEMPLATE["role"]),
+                            allow_delegation=allow_delegation)
+        else:
+            analyst = Agent(**DIRECT_ANALYST_TEMPLATE, tools=[], llm=llm_for(DIRECT_ANALYST_TEMPLATE["role"]))
         
-        # Create Translator Agent
-        translator = Agent(
-            role="Traductor",
-            goal="""Traducir cualquier texto de entrada proporcionado al idioma español. La traducción debe ser precisa y mantener el significado del contenido original. Si el texto ya está en español, simplemente devuelve el mismo texto.""",
-            backstory=(
-            """Eres un agente experto en traducción de idiomas. Tu objetivo es tomar cualquier texto proporcionado en cualquier idioma y traducirlo con precisión al español, asegurándote de mantener el contexto, significado y tono original. Si el texto ya está en español, simplemente devuélvelo sin modificaciones. Eres confiable, eficiente y tienes un conocimiento profundo de diferentes idiomas y matices culturales, lo que te permite realizar traducciones precisas y naturales."""),
-            verbose=True,
-            llm=llm,
-            max_iter=10,
-            allow_delegation=False,
-        )
-        
-        # Create Evaluator Agent
-        evaluator = Agent(
-            role="Evaluador de selección",
-            goal="""Determinar si el candidato cumple o no con los requisitos básicos del puesto a partir del análisis realizado de su hoja de vida y los requisitos del perfil. Tu respuesta debe ser "Cumple" o "No cumple" seguido de una justificación clara y concisa de tu decisión. No es necesario realizar un análisis detallado de cada criterio; solo verifica si el perfil del candidato se ajusta de manera general a los requisitos del puesto.""",
-            verbose=False,
-            backstory=(
-                """Eres un agente de selección cuyo único objetivo es verificar si el candidato tiene los requisitos generales para el puesto a partir del análisis obtenido de su hoja de vida y los requisitos del perfil. Debes determinar únicamente si cumple o no cumple como candidato para el perfil solicitado y proporcionar una justificación clara y concisa de tu decisión. No es necesario realizar un análisis detallado de cada criterio; solo verifica si el perfil del candidato se ajusta de manera general a los requisitos del puesto."""),
-            llm=llm,
-            max_iter=10,
-            allow_delegation=False,
-        )
+        # Create Translator and Evaluator Agents
+        translator = Agent(**TRANSLATOR_TEMPLATE, llm=llm_for(TRANSLATOR_TEMPLATE["role"]))
+        evaluator = Agent(**EVALUATOR_TEMPLATE, llm=llm_for(EVALUATOR_TEMPLATE["role"]))
         
         logging.info("Created agents successfully")
         return analyst, translator, evaluator
@@ -74,40 +113,168 @@ def create_agents(pdf_tool) -> Tuple[Agent, Agent, Agent]:
         logging.error(f"Error creating agents: {e}")
         raise
 
-def create_crew(cv_path: str) -> Tuple[Crew, any, any]:
+def make_llm_factory(event_queue: Optional[queue.Queue] = None,
+                     usage: Optional[dict] = None) -> Callable[[str], Any]:
+    """
+    Build per-agent LLMs on the pooled client with metrics and streaming callbacks.
+    
+    Args:
+        event_queue: Optional queue that receives the streamed tokens
+        usage: Optional dictionary that accumulates the tokens of every call
+        
+    Returns:
+        Callable mapping an agent role to its chat model
+    """
+    def factory(role: str):
+        callbacks = [MetricsCallbackHandler(role, usage)] if METRICS_ENABLED or usage is not None else []
+        if event_queue is not None:
+            callbacks.append(QueueCallbackHandler(event_queue, role))
+        return get_agent_llm(callbacks, streaming=event_queue is not None)
+    return factory
+
+def make_crew_step_callback(event_queue: Optional[queue.Queue] = None) -> Callable[[Any], None]:
+    """Crew step callback that counts tool invocations and streams progress"""
+    stream_step = make_step_callback(event_queue) if event_queue is not None else None
+    
+    def callback(step: Any):
+        for tool in step_tools(step):
+            metrics.increment("tool_invocations_total", tool=tool)
+        if stream_step is not None:
+            stream_step(step)
+    return callback
+
+def make_crew_task_callback(task_name: str, timer: dict, depends_on: Tuple[str, ...] = (),
+                            event_queue: Optional[queue.Queue] = None) -> Callable[[Any], None]:
+    """
+    Task callback that records the task duration and streams its output.
+    
+    Each task lasted from the completion of its dependencies (or the crew
+    creation) until its own completion, whether or not it ran concurrently.
+    
+    Args:
+        task_name: Name reported in metrics and stream events
+        timer: Shared dictionary holding the crew start time under "start" and
+            each finished task's completion time under its name
+        depends_on: Names of the tasks whose output this task uses
+        event_queue: Optional queue that receives the task output
+        
+    Returns:
+        Callback receiving the task output
+    """
+    stream_done = make_task_callback(event_queue, task_name) if event_queue is not None else None
+    
+    def callback(output: Any):
+        now = time.perf_counter()
+        duration = now - max([timer["start"]] + [timer[name] for name in depends_on if name in timer])
+        timer[task_name] = now
+        metrics.observe("task_duration_seconds", duration, task=task_name)
+        metrics.log_event("task", task=task_name, duration_ms=round(duration * 1000, 2))
+        if stream_done is not None:
+            stream_done(output)
+    return callback
+
+def create_crew(cv_path: Optional[str], include_translator: bool = True, direct: bool = False,
+                event_queue: Optional[queue.Queue] = None, usage: Optional[dict] = None) -> Tuple[Crew, any, any]:
     """
     Create a CrewAI crew with agents for CV analysis.
     
     Args:
-        cv_path: Path to the CV PDF file
+        cv_path: Path to the CV PDF file; unused in direct mode
+        include_translator: Whether to schedule the translator and let the
+            analyst delegate to it; skipped when the inputs are already Spanish
+        direct: Analyze the CV text passed as the "hoja_de_vida" input in a
+            single bounded call instead of searching the PDF
+        event_queue: Optional queue that receives streamed tokens, agent steps
+            and each task's output as soon as it finishes
+        usage: Optional dictionary that accumulates the tokens of every LLM call
         
     Returns:
         Tuple containing the crew, analysis task, and evaluation task
     """
     try:
-        # Initialize PDF tool
-        pdf_tool = PDFSearchTool(pdf=cv_path)
+        # Initialize PDF tool, reusing the cached embedding index when available
+        pdf_tool = None if direct else get_pdf_tool(cv_path)
         
-        # Create agents
-        analyst, translator, evaluator = create_agents(pdf_tool)
+        # Create agents, streaming their tokens when a queue is given
+        analyst, translator, evaluator = create_agents(
+            pdf_tool, allow_delegation=include_translator, llm_factory=make_llm_factory(event_queue, usage)
+        )
         
         # Create tasks
-        analysis_task = create_analysis_task(analyst, pdf_tool)
-        translator_task = create_translator_task(translator, analysis_task)
+        if direct:
+            analysis_task = create_direct_analysis_task(analyst)
+        else:
+            analysis_task = create_analysis_task(analyst, pdf_tool, allow_delegation=include_translator)
         evaluation_task = create_evaluation_task(evaluator, analysis_task)
+        if include_translator:
+            translator_task = create_translator_task(translator, analysis_task)
+            crew_agents = [analyst, translator, evaluator]
+            crew_tasks = [analysis_task, translator_task, evaluation_task]
+        else:
+            crew_agents = [analyst, evaluator]
+            crew_tasks = [analysis_task, evaluation_task]
+        
+        # Instrument tasks and steps, streaming them when a queue is given
+        timer = {"start": time.perf_counter()}
+        analysis_task.callback = make_crew_task_callback("analysis", timer, event_queue=event_queue)
+        evaluation_task.callback = make_crew_task_callback("evaluation", timer, ("analysis",), event_queue)
+        if include_translator:
+            translator_task.callback = make_crew_task_callback("translation", timer, ("analysis",), event_queue)
+        
+        # Run independent tasks concurrently; pipeline.run_crew waits for all of them
+        if CREW_PROCESS == "dag":
+            schedule_concurrent_tasks(crew_tasks)
         
         # Create crew
         crew = Crew(
-            agents=[analyst, translator, evaluator],
-            tasks=[analysis_task, translator_task, evaluation_task],
+            agents=crew_agents,
+            tasks=crew_tasks,
             process=Process.sequential,
             memory=False,
             verbose=True,
+            step_callback=make_crew_step_callback(event_queue),
         )
         
-        logging.info("Created crew successfully")
+        logging.info(f"Created crew successfully (translator: {include_translator}, direct: {direct})")
         return crew, analysis_task, evaluation_task
     
     except Exception as e:
         logging.error(f"Error creating crew: {e}")
         raise
+
+def create_criteria_crew(event_queue: Optional[queue.Queue] = None,
+                         usage: Optional[dict] = None) -> Tuple[Crew, any]:
+    """
+    Create a single-task crew that judges requirement criteria one by one.
+    
+    The direct mode analyst reads the CV text and the numbered criteria from
+    the "hoja_de_vida" and "criterios" inputs and answers in one bounded call.
+    
+    Args:
+        event_queue: Optional queue that receives streamed tokens and steps
+        usage: Optional dictionary that accumulates the tokens of every LLM call
+        
+    Returns:
+        Tuple containing the crew and the criteria task
+    """
+    try:
+        llm_for = make_llm_factory(event_queue, usage)
+        analyst = Agent(**DIRECT_ANALYST_TEMPLATE, tools=[], llm=llm_for(DIRECT_ANALYST_TEMPLATE["role"]))
+        criteria_task = create_criteria_task(analyst)
+        criteria_task.callback = make_crew_task_callback("criteria", {"start": time.perf_counter()})
+        
+        crew = Crew(
+            agents=[analyst],
+            tasks=[criteria_task],
+            process=Process.sequential,
+            memory=False,
+            verbose=True,
+            step_callback=make_crew_step_callback(event_queue),
+        )
+        
+        logging.info("Created criteria crew successfully")
+        return crew, criteria_task
+    
+    except Exception as e:
+        logging.error(f"Error creating criteria crew: {e}")
+        raise
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Headless batch screening of many CVs against one vacancy.
+
+Usage:
+    python batch.py <cv_folder> --requirements-file requisitos.txt --output resultados.jsonl
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set
+
+from config import (
+    setup_logging,
+    BATCH_WORKERS,
+    BATCH_MAX_RETRIES,
+    BATCH_RETRY_BASE_DELAY,
+    PRERANK_TOP_N,
+)
+from utils import compute_file_hash
+
+OUTPUT_FIELDS = [
+    "file",
+    "cv_hash",
+    "status",
+    "verdict",
+    "evaluation",
+    "analysis",
+    "processing_time",
+    "cached",
+    "attempts",
+    "prerank_rank",
+    "prerank_score",
+    "criteria",
+    "error",
+]
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception was caused by API rate limiting"""
+    message = str(error).lower()
+    return (
+        type(error).__name__ == "RateLimitError"
+        or "rate limit" in message
+        or "429" in message
+    )
+
+def screen_cv(cv_path: str, descripcion: str, max_retries: int = BATCH_MAX_RETRIES,
+              base_delay: float = BATCH_RETRY_BASE_DELAY) -> dict:
+    """
+    Analyze a single CV, retrying with exponential backoff on rate limits.
+
+    Args:
+        cv_path: Path to the CV PDF file
+        descripcion: Requirements text for the vacancy
+        max_retries: Maximum number of retries after a rate limit error
+        base_delay: Initial backoff delay in seconds
+
+    Returns:
+        Output row for the CV
+    """
+    # Imported here so worker processes load the crew stack themselves
+    from pipeline import analyze_cv
+
+    row = {
+        "file": os.path.basename(cv_path),
+        "cv_hash": compute_file_hash(cv_path),
+        "status": "error",
+        "attempts": 0,
+    }
+    for attempt in range(max_retries + 1):
+        row["attempts"] = attempt + 1
+        try:
+            result = analyze_cv(cv_path, descripcion)
+            row.update({
+                "status": "ok",
+                "verdict": result["verdict"],
+                "evaluation": result["evaluation"],
+                "analysis": result["analysis"],
+                "processing_time": result["processing_time"],
+                "cached": result["cached"],
+                "error": "",
+            })
+            return row
+        except Exception as e:
+            row["error"] = str(e)
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                logging.error(f"Error screening {cv_path}: {e}")
+                return row
+            delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            logging.warning(f"Rate limited while screening {cv_path}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    return row
+
+def list_cvs(folder: str) -> List[str]:
+    """List the PDF files in a folder, sorted by name"""
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(folder, name))
+    )
+
+def detect_format(output_path: str) -> str:
+    """Infer the output format from the file extension"""
+    return "csv" if output_path.lower().endswith(".csv") else "jsonl"
+
+def load_completed(output_path: str, output_format: str) -> Set[str]:
+    """
+    Read the CV hashes already screened or prefiltered in a previous run.
+
+    Args:
+        output_path: Path to the output file
+        output_format: "jsonl" or "csv"
+
+    Returns:
+        Set of CV content hashes with status "ok" or "prefiltered"
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, newline="", encoding="utf-8") as f:
+        if output_format == "csv":
+            rows: Iterable[dict] = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if row.get("status") in ("ok", "prefiltered"):
+                completed.add(row["cv_hash"])
+    return completed
+
+class ResultWriter:
+    """Append-only JSONL/CSV writer that flushes every row"""
+
+    def __init__(self, output_path: str, output_format: str):
+        self.output_format = output_format
+        write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._file = open(output_path, "a", newline="", encoding="utf-8")
+        self._csv = None
+        if output_format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, row: dict):
+        if self._csv is not None:
+            # Nested values such as the per-criterion evidence are stored as JSON
+            self._csv.writerow({
+                name: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+                for name, value in row.items()
+            })
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def prerank_row(entry: dict) -> dict:
+    """Pre-ranking fields added to a CV's output row"""
+    return {
+        "prerank_rank": entry["rank"],
+        "prerank_score": entry["score"],
+        "criteria": entry["criteria"],
+    }
+
+def prefiltered_row(entry: dict) -> dict:
+    """Output row for a CV discarded by the pre-ranking without a crew analysis"""
+    from vacancy import missing_criteria
+
+    return {
+        "file": os.path.basename(entry["cv"]),
+        "cv_hash": entry["cv_hash"],
+        "status": "prefiltered",
+        "verdict": "No cumple",
+        "evaluation": "Sin evidencia en la hoja de vida para: " + "; ".join(missing_criteria(entry)),
+        "attempts": 0,
+        "error": "",
+        **prerank_row(entry),
+    }
+
+def run_batch(folder: str, descripcion: str, output_path: str, workers: int = BATCH_WORKERS,
+              output_format: Optional[str] = None, use_threads: bool = False,
+              resume: bool = True, max_retries: int = BATCH_MAX_RETRIES,
+              top_n: int = PRERANK_TOP_N) -> dict:
+    """
+    Screen every PDF in a folder against one vacancy with bounded concurrency.
+
+    Results are streamed to the output file as each CV finishes, so an
+    interrupted run can be resumed and only the missing CVs are analyzed.
+
+    With top_n set, CVs are first ranked by embedding similarity to each
+    requirement, and only the top N plus those whose match is ambiguous go to
+    the crew; the rest are written as "prefiltered" with the missing criteria.
+
+    Args:
+        folder: Folder containing the CV PDF files
+        descripcion: Requirements text for the vacancy
+        output_path: JSONL or CSV file where results are appended
+        workers: Number of concurrent workers
+        output_format: "jsonl" or "csv"; inferred from output_path if omitted
+        use_threads: Use a thread pool instead of a process pool
+        resume: Skip CVs already screened successfully in output_path
+        max_retries: Maximum number of retries after a rate limit error
+        top_n: Number of best pre-ranked CVs sent to the crew; 0 disables pre-ranking
+
+    Returns:
+        Summary with the number of screened, prefiltered, skipped and failed CVs
+    """
+    output_format = output_format or detect_format(output_path)
+    cv_paths = list_cvs(folder)
+    completed = load_completed(output_path, output_format) if resume else set()
+    pending = [path for path in cv_paths if compute_file_hash(path) not in completed]
+    summary = {"total": len(cv_paths), "skipped": len(cv_paths) - len(pending), "ok": 0, "error": 0}
+
+    start_time = time.time()
+    ranked: Dict[str, dict] = {}
+    discarded: List[dict] = []
+    if top_n > 0 and pending:
+        from vacancy import prerank_cvs, select_for_crew
+
+        # Rank the whole folder so resumed runs keep the same top N; CV
+        # embeddings are cached, so already ranked CVs cost no API calls
+        ranking = prerank_cvs(cv_paths, descripcion)
+        selected = {entry["cv"] for entry in select_for_crew(ranking, top_n)}
+        ranked = {entry["cv"]: entry for entry in ranking}
+        discarded = [entry for entry in ranking if entry["cv"] not in selected and entry["cv_hash"] not in completed]
+        pending = [path for path in pending if path in selected]
+        summary["prefiltered"] = len(discarded)
+        logging.info(f"Pre-ranking kept {len(selected)} of {len(ranking)} CVs for the crew")
+    logging.info(f"Batch screening {len(pending)} of {len(cv_paths)} CVs with {workers} workers")
+
+    if use_threads:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    else:
+        # Spawned workers open their own API connections; forked ones would
+        # share the keep-alive sockets the pre-ranking opened in this process
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    with ResultWriter(output_path, output_format) as writer, executor:
+        for entry in discarded:
+            writer.write(prefiltered_row(entry))
+        futures = {
+            executor.submit(screen_cv, path, descripcion, max_retries): path
+            for path in pending
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                logging.error(f"Worker failed screening {path}: {e}")
+                row = {"file": os.path.basename(path), "cv_hash": compute_file_hash(path),
+                       "status": "error", "error": str(e)}
+            if path in ranked:
+                row.update(prerank_row(ranked[path]))
+            writer.write(row)
+            summary[row["status"]] += 1
+            logging.info(f"Screened {row['file']}: {row.get('verdict', row['status'])}")
+
+    summary["elapsed"] = round(time.time() - start_time, 2)
+    logging.info(f"Batch screening finished: {summary}")
+    return summary
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Analiza en lote hojas de vida contra los requisitos de una vacante.")
+    parser.add_argument("folder", help="Carpeta con las hojas de vida en PDF")
+    requirements = parser.add_mutually_exclusive_group(required=True)
+    requirements.add_argument("--requirements", help="Texto con los requisitos del perfil")
+    requirements.add_argument("--requirements-file", help="Archivo con los requisitos del perfil")
+    parser.add_argument("--output", required=True, help="Archivo de resultados (.jsonl o .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Formato de salida")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Número de análisis concurrentes")
+    parser.add_argument("--threads", action="store_true", help="Usar hilos en lugar de procesos")
+    parser.add_argument("--retries", type=int, default=BATCH_MAX_RETRIES, help="Reintentos ante límites de tasa")
+    parser.add_argument("--no-resume", action="store_true", help="Volver a analizar todas las hojas de vida")
+    parser.add_argument("--top-n", type=int, default=PRERANK_TOP_N,
+                        help="Preseleccionar por similitud y analizar solo las N mejores hojas de vida (0 las analiza todas)")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if args.requirements_file:
+        with open(args.requirements_file, encoding="utf-8") as f:
+            descripcion = f.read()
+    else:
+        descripcion = args.requirements
+
+    summary = run_batch(
+        args.folder,
+        descripcion,
+        args.output,
+        workers=args.workers,
+        output_format=args.format,
+        use_threads=args.threads,
+        resume=not args.no_resume,
+        max_retries=args.retries,
+        top_n=args.top_n,
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if summary["error"] else 0
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for CV Analyzer.
+
+Runs against a local OpenAI-compatible stub server with deterministic canned
+responses and a synthetic corpus of PDF CVs, so latency, memory and LLM call
+counts can be tracked on any machine without network access.
+
+Each scenario runs twice in its own process: once untraced for latency and
+resident memory, and once under tracemalloc for the Python heap peak, so
+tracing does not slow the timed runs and peaks do not carry over between
+scenarios.
+
+Usage:
+    python benchmark.py --scenarios previews,indexing,crew,batch --cvs 10 --pages 1,3,10
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import base64
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+import statistics
+import tracemalloc
+import resource
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+SCENARIOS = ("previews", "indexing", "crew", "batch")
+
+# Measurements reported for each scenario
+SCENARIO_MEASUREMENTS = {
+    "previews": ["previews"],
+    "indexing": ["indexing_cold", "indexing_warm"],
+    "crew": ["crew"],
+    "batch": ["batch"],
+}
+
+BENCHMARK_REQUIREMENTS = (
+    "Profesional en ingeniería de sistemas o afines. Experiencia mínima de 3 años en desarrollo "
+    "de modelos de Machine Learning con Scikit-Learn y TensorFlow. Programación en Python y R, "
+    "SQL avanzado, manejo de herramientas de visualización y nivel de inglés B2."
+)
+
+EMBEDDING_DIMENSIONS = 1536
+PDF_TOOL_NAME = "Search a PDF's content"
+
+class StubLLMServer:
+    """
+    OpenAI-compatible HTTP server returning deterministic canned responses.
+
+    Chat completions answer in the ReAct format CrewAI agents parse. The
+    analyst first calls the PDF search tool `tool_calls` times; the evaluator
+    always answers with a verdict. Embeddings are pseudo-random vectors seeded
+    by the input text.
+    """
+
+    def __init__(self, latency: float = 0.05, completion_tokens: int = 200, tool_calls: int = 1):
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.tool_calls = tool_calls
+        self.counts = {"chat": 0, "embeddings": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.port = self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def chat_answer(self, messages: List[dict]) -> str:
+        """Canned ReAct answer for a chat request"""
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        filler = " ".join(["detalle"] * max(self.completion_tokens - 20, 0))
+        if "Evaluador de selección" in prompt:
+            return f"Thought: Tengo la respuesta final.\nFinal Answer: Cumple. El candidato se ajusta a los requisitos generales. {filler}"
+        if PDF_TOOL_NAME in prompt and prompt.count("Observation:") < self.tool_calls:
+            return (
+                "Thought: Necesito revisar la hoja de vida.\n"
+                f"Action: {PDF_TOOL_NAME}\n"
+                'Action Input: {"query": "experiencia en Python y Machine Learning"}'
+            )
+        return (
+            "Thought: Tengo la respuesta final.\n"
+            "Final Answer: Python: cumple. SQL: cumple. Machine Learning: cumple. Inglés: no cumple. "
+            f"{filler}"
+        )
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(server.latency)
+                if self.path.endswith("/embeddings"):
+                    server._count("embeddings")
+                    self._send_json(server._embeddings(request))
+                elif self.path.endswith("/chat/completions"):
+                    server._count("chat")
+                    answer = server.chat_answer(request.get("messages", []))
+                    if request.get("stream"):
+                        self._send_stream(request, answer)
+                    else:
+                        self._send_json(server._completion(request, answer))
+                else:
+                    self.send_error(404)
+
+            def do_GET(self):
+                # Lets scenario processes read the call counts around their timed run
+                if self.path == "/stub/counts":
+                    with server._lock:
+                        counts = dict(server.counts)
+                    self._send_json(counts)
+                else:
+                    self.send_error(404)
+
+            def _send_stream(self, request: dict, answer: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in answer.split(" "):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def _completion(request: dict, answer: str) -> dict:
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+        completion_tokens = len(answer.split())
+        return {
+            "id": "stub", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_chars // 4 + completion_tokens,
+            },
+        }
+
+    @staticmethod
+    def _embeddings(request: dict) -> dict:
+        inputs = request.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for i, text in enumerate(inputs):
+            rng = random.Random(hashlib.sha256(str(text).encode("utf-8")).digest())
+            vector = [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+            if request.get("encoding_format") == "base64":
+                # The openai client requests packed float32 vectors by default
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        return {"object": "list", "data": data, "model": request.get("model", "stub"),
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+
+def generate_cv(path: str, pages: int, seed: int = 0):
+    """
+    Write a synthetic Spanish CV with the usual sections spread over `pages` pages.
+
+    Args:
+        path: Output PDF path
+        pages: Number of pages
+        seed: Seed for the generated content
+    """
+    import fitz
+
+    rng = random.Random(seed)
+    skills = ["Python", "R", "SQL", "TensorFlow", "Scikit-Learn", "Power BI", "Spark", "Docker", "Airflow"]
+    companies = ["Datos Andinos", "Analítica del Valle", "Soluciones Nova", "Banco Central", "Grupo Éxito"]
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        lines = []
+        if page_num == 0:
+            lines += [f"Candidato {seed}", "Perfil", "Científico de datos con experiencia en modelos predictivos.", ""]
+        lines.append("Experiencia")
+        for _ in range(6):
+            start = rng.randint(2008, 2020)
+            lines += [
+                f"{rng.choice(companies)} ({start}-{start + rng.randint(1, 4)})",
+                f"Desarrollo de modelos con {rng.choice(skills)} y {rng.choice(skills)} para la gestión de datos.",
+            ]
+        lines += ["", "Educación", "Ingeniería de Sistemas, Universidad Nacional", "", "Habilidades",
+                  ", ".join(rng.sample(skills, 5))]
+        page.insert_text((50, 60), "\n".join(lines), fontsize=10)
+    doc.save(path)
+    doc.close()
+
+def generate_corpus(folder: str, count: int, page_counts: List[int]) -> List[str]:
+    """Generate `count` CVs cycling through the given page counts"""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"cv_{i:04d}.pdf")
+        generate_cv(path, page_counts[i % len(page_counts)], seed=i)
+        paths.append(path)
+    return paths
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles of a list of durations in seconds"""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+    if len(ordered) > 1:
+        percentiles = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95 = percentiles[49], percentiles[94]
+    else:
+        p50 = p95 = ordered[0]
+    return {
+        "n": len(ordered),
+        "p50": round(p50, 4),
+        "p95": round(p95, 4),
+        "mean": round(statistics.fmean(ordered), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+def timed(function: Callable, *args, **kwargs) -> float:
+    start_time = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start_time
+
+def prepare_measurement(name: str, corpus: List[str], workers: int, work_dir: str) -> Callable[[], List[float]]:
+    """Set up a measurement and return the run whose latencies are reported"""
+    # Modules are imported after the environment points every client at the
+    # stub server, and only for the selected measurement
+    if name == "previews":
+        import utils
+
+        def previews():
+            samples = []
+            for path in corpus:
+                utils.clear_preview_cache()
+                samples.append(timed(utils.get_pdf_previews, path))
+            return samples
+        return previews
+
+    if name in ("indexing_cold", "indexing_warm"):
+        import index_cache
+        if name == "indexing_warm":
+            for path in corpus:
+                index_cache.get_pdf_tool(path)
+        return lambda: [timed(index_cache.get_pdf_tool, path) for path in corpus]
+
+    if name == "crew":
+        import pipeline
+        return lambda: [
+            timed(pipeline.analyze_cv, path, BENCHMARK_REQUIREMENTS, use_cache=False) for path in corpus
+        ]
+
+    if name == "batch":
+        import batch
+
+        def batch_run():
+            output = os.path.join(work_dir, f"batch_{time.time_ns()}.jsonl")
+            summary = batch.run_batch(os.path.dirname(corpus[0]), BENCHMARK_REQUIREMENTS, output,
+                                      workers=workers, use_threads=True, resume=False)
+            with open(output, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            summary["throughput_cvs_per_s"] = round(len(rows) / max(summary["elapsed"], 1e-9), 3)
+            print(json.dumps({"scenario": "batch_summary", **summary}), flush=True)
+            return [row["processing_time"] for row in rows if row.get("status") == "ok"]
+        return batch_run
+
+    raise ValueError(f"Unknown measurement: {name}")
+
+def get_stub_counts(stub_url: str) -> Dict[str, int]:
+    """Call counts of the stub server"""
+    with urllib.request.urlopen(f"{stub_url}/stub/counts", timeout=10) as response:
+        return json.load(response)
+
+def measure(name: str, corpus: List[str], workers: int, work_dir: str, stub_url: str, trace_memory: bool) -> dict:
+    """
+    Run a measurement in the current process.
+
+    Args:
+        name: Measurement to run
+        corpus: Paths of the synthetic CVs
+        workers: Workers of the batch measurement
+        work_dir: Folder for the measurement's caches and outputs
+        stub_url: Base URL of the stub server, without the API prefix
+        trace_memory: Whether to trace Python allocations instead of timing
+
+    Returns:
+        Latencies, resident memory and stub calls, or the Python heap peak
+        when tracing memory
+    """
+    run = prepare_measurement(name, corpus, workers, work_dir)
+    if trace_memory:
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"python_peak_mb": round(peak / 1024 / 1024, 2)}
+
+    counts_before = get_stub_counts(stub_url)
+    start_time = time.perf_counter()
+    samples = run()
+    elapsed = time.perf_counter() - start_time
+    counts_after = get_stub_counts(stub_url)
+    return {
+        "latency": summarize(samples),
+        "elapsed": round(elapsed, 3),
+        # ru_maxrss is in KiB on Linux and covers only this measurement's process
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        "llm_calls": {endpoint: counts_after[endpoint] - counts_before.get(endpoint, 0) for endpoint in counts_after},
+    }
+
+def run_measurement(name: str, corpus_dir: str, workers: int, work_dir: str, stub_url: str, trace_memory: bool) -> dict:
+    """Run a measurement in a fresh process with its own caches"""
+    run_dir = os.path.join(work_dir, f"{name}_{'memory' if trace_memory else 'timing'}")
+    os.makedirs(run_dir, exist_ok=True)
+    report_path = os.path.join(run_dir, "report.json")
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        "--measure", name, "--corpus-dir", corpus_dir, "--workers", str(workers),
+        "--work-dir", run_dir, "--stub-url", stub_url, "--report", report_path,
+    ]
+    if trace_memory:
+        command.append("--trace-memory")
+    env = dict(os.environ, CACHE_DIR=os.path.join(run_dir, "cache"))
+    subprocess.run(command, env=env, check=True)
+    with open(report_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def run_scenarios(scenarios: List[str], corpus_dir: str, stub: StubLLMServer, workers: int, work_dir: str) -> List[dict]:
+    """Run the selected scenarios over the corpus, each measurement in its own processes"""
+    stub_url = stub.base_url[:-len("/v1")]
+    reports = []
+    for scenario in scenarios:
+        for name in SCENARIO_MEASUREMENTS[scenario]:
+            timing = run_measurement(name, corpus_dir, workers, work_dir, stub_url, trace_memory=False)
+            memory = run_measurement(name, corpus_dir, workers, work_dir, stub_url, trace_memory=True)
+            report = {"scenario": name, **timing, **memory}
+            print(json.dumps(report, ensure_ascii=False), flush=True)
+            reports.append(report)
+    return reports
+
+def list_corpus(folder: str) -> List[str]:
+    """Paths of the CVs of a generated corpus"""
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".pdf"))
+
+def measure_main(args: argparse.Namespace) -> int:
+    """Entry point of a measurement process"""
+    import config
+    config.setup_logging()
+    report = measure(args.measure, list_corpus(args.corpus_dir), args.workers, args.work_dir,
+                     args.stub_url, args.trace_memory)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False)
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark offline de CV Analyzer con un servidor LLM simulado.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Escenarios separados por comas")
+    parser.add_argument("--cvs", type=int, default=10, help="Número de hojas de vida sintéticas")
+    parser.add_argument("--pages", default="1,3,10", help="Páginas por hoja de vida, separadas por comas")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia simulada por llamada (s)")
+    parser.add_argument("--completion-tokens", type=int, default=200, help="Tokens por respuesta simulada")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Búsquedas en el PDF antes de responder")
+    parser.add_argument("--workers", type=int, default=4, help="Trabajadores del escenario batch")
+    parser.add_argument("--output", help="Archivo JSON donde guardar el reporte")
+    # Internal options of the per-measurement processes
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    parser.add_argument("--trace-memory", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.measure:
+        return measure_main(args)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    stub = StubLLMServer(latency=args.latency, completion_tokens=args.completion_tokens, tool_calls=args.tool_calls)
+    stub.start()
+    work_dir = tempfile.mkdtemp(prefix="cv-bench-")
+
+    # Point every client at the stub, isolate caches and disable telemetry
+    os.environ.update({
+        "OPENAI_API_BASE": stub.base_url,
+        "OPENAI_BASE_URL": stub.base_url,
+        "CACHE_DIR": os.path.join(work_dir, "cache"),
+        "RESULT_CACHE_BACKEND": "none",
+        "METRICS_PORT": "0",
+        "EC_TELEMETRY": "false",
+        "ANONYMIZED_TELEMETRY": "False",
+        "OTEL_SDK_DISABLED": "true",
+    })
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    corpus_dir = os.path.join(work_dir, "cvs")
+    generate_corpus(corpus_dir, args.cvs, [int(p) for p in args.pages.split(",")])
+    try:
+        reports = run_scenarios(scenarios, corpus_dir, stub, args.workers, work_dir)
+    finally:
+        stub.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"reports": reports, "settings": vars(args)}, f, ensure_ascii=False, indent=2)
+    return 0
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main())
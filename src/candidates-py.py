@@ -0,0 +1,175 @@
+"""
+Persistent candidate store with per-requirement verdicts for incremental re-evaluation.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from config import CANDIDATE_STORE_PATH
+from extraction import EXTRACTION_VERSION
+
+def make_candidate_key(cv_hash: str, extraction_version: str = EXTRACTION_VERSION) -> str:
+    """
+    Build the store key of a candidate from its CV hash and the extraction version.
+
+    Stored sections and the verdicts judged on them are tied to the extraction
+    that produced them, so a change in extraction or sectioning re-extracts
+    the CV instead of reusing stale sections.
+
+    Args:
+        cv_hash: SHA-256 digest of the CV PDF content
+        extraction_version: Version of the page extraction and sectioning
+
+    Returns:
+        Candidate key
+    """
+    return f"{cv_hash}:{extraction_version}"
+
+class CandidateStore:
+    """
+    Local SQLite store of candidates and their per-criterion verdicts.
+
+    Candidates are keyed by the CV content hash and the extraction version
+    (see make_candidate_key) and keep the extracted text, its sections and
+    chunks, so a CV is only read once. Verdicts are keyed by candidate key,
+    criterion hash, model and prompt version, so editing the requirements
+    only leaves the new or changed criteria to be judged.
+    """
+
+    def __init__(self, path: str = CANDIDATE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS candidates (
+                    cv_hash TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    sections TEXT NOT NULL,
+                    chunks TEXT NOT NULL,
+                    created REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS verdicts (
+                    cv_hash TEXT NOT NULL,
+                    criterion_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    criterion TEXT NOT NULL,
+                    verdict TEXT NOT NULL,
+                    justification TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (cv_hash, criterion_hash, model, prompt_version)
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get_candidate(self, cv_hash: str) -> Optional[dict]:
+        """
+        Load a stored candidate.
+
+        Args:
+            cv_hash: Candidate key from make_candidate_key
+
+        Returns:
+            Dictionary with "text", "sections" and "chunks", or None if unknown
+        """
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT text, sections, chunks FROM candidates WHERE cv_hash = ?", (cv_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        text, sections, chunks = row
+        return {"text": text, "sections": json.loads(sections), "chunks": json.loads(chunks)}
+
+    def save_candidate(self, cv_hash: str, text: str, sections: Dict[str, str], chunks: List[dict]):
+        """
+        Store a candidate's extracted text, sections and chunks.
+
+        Args:
+            cv_hash: Candidate key from make_candidate_key
+            text: Text extracted from the CV
+            sections: Ordered mapping of section name to text
+            chunks: Section-aware chunks of the text
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO candidates (cv_hash, text, sections, chunks, created) VALUES (?, ?, ?, ?, ?)",
+                (cv_hash, text, json.dumps(sections, ensure_ascii=False),
+                 json.dumps(chunks, ensure_ascii=False), time.time()),
+            )
+
+    def get_verdicts(self, cv_hash: str, criterion_hashes: Iterable[str], model: str,
+                     prompt_version: str) -> Dict[str, dict]:
+        """
+        Load the stored verdicts of a candidate for some criteria.
+
+        Args:
+            cv_hash: Candidate key from make_candidate_key
+            criterion_hashes: Hashes of the criteria to look up
+            model: LLM model that produced the verdicts
+            prompt_version: Version of the prompts that produced the verdicts
+
+        Returns:
+            Mapping of criterion hash to its verdict, for the criteria found
+        """
+        criterion_hashes = list(criterion_hashes)
+        if not criterion_hashes:
+            return {}
+        placeholders = ", ".join("?" * len(criterion_hashes))
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"""SELECT criterion_hash, criterion, verdict, justification FROM verdicts
+                    WHERE cv_hash = ? AND model = ? AND prompt_version = ?
+                    AND criterion_hash IN ({placeholders})""",
+                (cv_hash, model, prompt_version, *criterion_hashes),
+            ).fetchall()
+        return {
+            criterion_hash: {"criterion": criterion, "verdict": verdict, "justification": justification}
+            for criterion_hash, criterion, verdict, justification in rows
+        }
+
+    def save_verdicts(self, cv_hash: str, model: str, prompt_version: str, verdicts: Dict[str, dict]):
+        """
+        Store per-criterion verdicts of a candidate.
+
+        Args:
+            cv_hash: Candidate key from make_candidate_key
+            model: LLM model that produced the verdicts
+            prompt_version: Version of the prompts that produced the verdicts
+            verdicts: Mapping of criterion hash to a dictionary with the
+                "criterion", its "verdict" and the "justification"
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO verdicts
+                    (cv_hash, criterion_hash, model, prompt_version, criterion, verdict, justification, created)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (cv_hash, criterion_hash, model, prompt_version,
+                     item["criterion"], item["verdict"], item["justification"], now)
+                    for criterion_hash, item in verdicts.items()
+                ],
+            )
+
+_candidate_store: Optional[CandidateStore] = None
+_candidate_store_lock = threading.Lock()
+
+def get_candidate_store() -> CandidateStore:
+    """The process-wide candidate store, created on first use"""
+    global _candidate_store
+    with _candidate_store_lock:
+        if _candidate_store is None:
+            _candidate_store = CandidateStore()
+            logging.info(f"Using candidate store at {CANDIDATE_STORE_PATH}")
+        return _candidate_store
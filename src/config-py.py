@@ -5,8 +5,7 @@ Configuration settings and constants for CV Analyzer.
 import os
 import logging
 import warnings
-import google.cloud.logging
-import chromadb
+import threading
 from dotenv import load_dotenv
 
 # Suppress warnings
@@ -18,17 +17,141 @@ load_dotenv(override=True)
 # API Keys and model settings
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-ada-002")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+
+# Pooled LLM client: max connections bounds the concurrent LLM requests per process
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.7))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 10))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60.0))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 120.0))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", 300.0))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
 
 # Application paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
-DOCS_FOLDER = os.path.join(BASE_DIR, "docs")
 LOGO_PATH = os.path.join(ASSETS_DIR, "cyborg.png")
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+
+# PDF previews
+PREVIEW_THUMBNAIL_SCALE = float(os.getenv("PREVIEW_THUMBNAIL_SCALE", 0.75))
+PREVIEW_FULL_SCALE = float(os.getenv("PREVIEW_FULL_SCALE", 2.0))
+PREVIEW_PAGE_SIZE = int(os.getenv("PREVIEW_PAGE_SIZE", 3))
+PREVIEW_FORMAT = os.getenv("PREVIEW_FORMAT", "JPEG")  # JPEG | WEBP | PNG
+PREVIEW_QUALITY = int(os.getenv("PREVIEW_QUALITY", 80))
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", 4))
+PREVIEW_CACHE_MAX_BYTES = int(os.getenv("PREVIEW_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Page-level text extraction: documents with at least
+# EXTRACTION_PARALLEL_MIN_PAGES pages are split across worker processes.
+# Sections start at keyword headings, or at short lines at least
+# EXTRACTION_HEADING_SIZE_RATIO times the font size of those headings
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2))
+EXTRACTION_PARALLEL_MIN_PAGES = int(os.getenv("EXTRACTION_PARALLEL_MIN_PAGES", 8))
+EXTRACTION_PAGES_PER_TASK = int(os.getenv("EXTRACTION_PAGES_PER_TASK", 4))
+EXTRACTION_HEADING_SIZE_RATIO = float(os.getenv("EXTRACTION_HEADING_SIZE_RATIO", 1.2))
+
+# PDF embedding index cache: entries being built or used, or used within the
+# last INDEX_CACHE_GRACE_SECONDS, are never evicted
+INDEX_CACHE_DIR = os.path.join(CACHE_DIR, "pdf_index")
+INDEX_CACHE_MAX_BYTES = int(os.getenv("INDEX_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+INDEX_CACHE_MAX_ENTRIES = int(os.getenv("INDEX_CACHE_MAX_ENTRIES", 200))
+INDEX_CACHE_GRACE_SECONDS = float(os.getenv("INDEX_CACHE_GRACE_SECONDS", 600))
+
+# Analysis result cache
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "sqlite")  # sqlite | memory | none
+RESULT_CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite3")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 7 * 24 * 60 * 60))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1000))
+
+# Analysis mode: "direct" injects the extracted CV text into a single bounded
+# analysis call, "retrieval" searches the PDF with the embedding tool,
+# "auto" picks direct mode for CVs up to DIRECT_ANALYSIS_MAX_CHARS characters
+# and "incremental" judges each requirement separately, reusing the stored
+# verdicts of unchanged requirements
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "auto")
+DIRECT_ANALYSIS_MAX_CHARS = int(os.getenv("DIRECT_ANALYSIS_MAX_CHARS", 12000))
+DIRECT_ANALYSIS_MAX_ITER = int(os.getenv("DIRECT_ANALYSIS_MAX_ITER", 2))
+
+# Crew task scheduling: "dag" runs tasks that only share a dependency (the
+# translation and the evaluation of the analysis) concurrently, "sequential"
+# runs them one after another
+CREW_PROCESS = os.getenv("CREW_PROCESS", "dag")
+
+# Prompt token budgets: the requirements and the CV text injected in direct
+# mode are cut to their budgets, and LLM calls whose prompt exceeds
+# PROMPT_TOKEN_BUDGET are logged and counted. The requirements budget covers
+# the 10000 characters the UI accepts, and the CV budget the
+# DIRECT_ANALYSIS_MAX_CHARS characters admitted to direct mode.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 11000))
+PROMPT_REQUIREMENTS_MAX_TOKENS = int(os.getenv("PROMPT_REQUIREMENTS_MAX_TOKENS", 5000))
+PROMPT_CV_MAX_TOKENS = int(os.getenv("PROMPT_CV_MAX_TOKENS", 5000))
+
+# Candidate store for incremental analyses: the final verdict is "Cumple" when
+# at least CRITERIA_PASS_RATIO of the requirements are met
+CANDIDATE_STORE_PATH = os.path.join(CACHE_DIR, "candidates.sqlite3")
+CRITERIA_PASS_RATIO = float(os.getenv("CRITERIA_PASS_RATIO", 0.8))
+
+# Stream agent tokens and task outputs to the UI while the crew runs
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+
+# Language detection
+LANGUAGE_DETECTION_ENABLED = os.getenv("LANGUAGE_DETECTION_ENABLED", "true").lower() == "true"
+LANGUAGE_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_MIN_CONFIDENCE", 0.4))
+
+# Startup: Streamlit re-executes main.py on every interaction, so the time
+# from script start to the rendered form must stay within this budget
+STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", 500))
+
+# Performance metrics: structured span logs, a Prometheus textfile and an
+# optional /metrics HTTP endpoint (disabled when METRICS_PORT is 0)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(CACHE_DIR, "metrics.prom"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# Vacancy pre-ranking: requirements are split into criteria and CV chunks are
+# scored against each one by cosine similarity before any LLM call. A criterion
+# is met at or above the match threshold, missing below the miss threshold and
+# ambiguous in between
+VACANCY_INDEX_DIR = os.path.join(CACHE_DIR, "vacancy_index")
+PRERANK_CHUNK_CHARS = int(os.getenv("PRERANK_CHUNK_CHARS", 800))
+PRERANK_MATCH_THRESHOLD = float(os.getenv("PRERANK_MATCH_THRESHOLD", 0.82))
+PRERANK_MISS_THRESHOLD = float(os.getenv("PRERANK_MISS_THRESHOLD", 0.75))
+PRERANK_TOP_N = int(os.getenv("PRERANK_TOP_N", 0))  # 0 sends every CV to the crew
+
+# Background analysis jobs: at most JOB_WORKERS run at once, JOB_QUEUE_SIZE
+# more may wait, and finished jobs stay available for JOB_RESULT_TTL seconds.
+# The UI checks unfinished jobs every JOB_POLL_INTERVAL seconds
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 16))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", 2))
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread")  # thread | process
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 60 * 60))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+
+# Batch screening
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 4))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", 5))
+BATCH_RETRY_BASE_DELAY = float(os.getenv("BATCH_RETRY_BASE_DELAY", 2.0))
+
+# Process-wide resources are initialized once, not on every Streamlit rerun
+_logging_configured = False
+_chroma_initialized = False
+_init_lock = threading.Lock()
 
 def setup_logging():
-    """Configure logging for the application"""
+    """Configure logging for the application, once per process"""
+    global _logging_configured
+    with _init_lock:
+        if _logging_configured:
+            return
+        _logging_configured = True
+    
     # Set up Google Cloud Logging
     try:
+        import google.cloud.logging
         client = google.cloud.logging.Client()
         client.setup_logging()
     except Exception as e:
@@ -40,9 +163,17 @@ def setup_logging():
         logging.warning(f"Failed to set up Google Cloud Logging: {e}")
     
     logging.info("Starting CV Analysis Application...")
+
+def init_chroma():
+    """Reset the ChromaDB shared system cache, once per process, before its first use"""
+    global _chroma_initialized
+    with _init_lock:
+        if _chroma_initialized:
+            return
+        _chroma_initialized = True
     
-    # Initialize ChromaDB
     try:
+        import chromadb
         chromadb.api.client.SharedSystemClient.clear_system_cache()
     except Exception as e:
         logging.warning(f"Failed to clear ChromaDB cache: {e}")
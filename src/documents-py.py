@@ -0,0 +1,163 @@
+"""
+In-memory store for uploaded CVs with reference-counted cleanup.
+"""
+
+import os
+import re
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+class _Document:
+    """Upload bytes plus the temp file spilled for tools that need a path"""
+
+    def __init__(self, data: bytes, name: str):
+        self.data = data
+        self.name = name
+        self.refcount = 0
+        self.spill_dir: Optional[str] = None
+
+class DocumentStore:
+    """
+    Process-wide store of uploaded PDFs keyed by content hash.
+
+    Documents live in memory while anything references them (a browser
+    session showing the upload or an analysis in flight) and are only written
+    to an isolated temp directory when a tool needs a file path. When the last
+    reference is released the bytes and any spilled file are dropped, so one
+    user's cleanup never touches another user's documents.
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, _Document] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, data: bytes, name: str = "document.pdf") -> str:
+        """
+        Add a reference to a document, storing it if needed.
+
+        Args:
+            data: PDF bytes
+            name: Original file name
+
+        Returns:
+            Document id (SHA-256 of the content)
+        """
+        doc_id = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            document = self._documents.get(doc_id)
+            if document is None:
+                document = self._documents[doc_id] = _Document(data, name)
+            document.refcount += 1
+        return doc_id
+
+    def release(self, doc_id: str):
+        """
+        Drop a reference, deleting the document when none remain.
+
+        Args:
+            doc_id: Document id returned by acquire
+        """
+        with self._lock:
+            document = self._documents.get(doc_id)
+            if document is None:
+                return
+            document.refcount -= 1
+            if document.refcount > 0:
+                return
+            del self._documents[doc_id]
+        if document.spill_dir:
+            shutil.rmtree(document.spill_dir, ignore_errors=True)
+        logging.info(f"Released document {document.name}")
+
+    def get(self, doc_id: str) -> bytes:
+        """Bytes of a stored document"""
+        with self._lock:
+            return self._documents[doc_id].data
+
+    @contextmanager
+    def path(self, data: bytes, name: str = "document.pdf") -> Iterator[str]:
+        """
+        Hold a reference to a document and expose it as a file path.
+
+        The file is written once per document into its own temp directory
+        and shared by concurrent users until the last reference is released.
+
+        Args:
+            data: PDF bytes
+            name: Original file name
+
+        Yields:
+            Path to the spilled PDF file
+        """
+        doc_id = self.acquire(data, name)
+        try:
+            with self._lock:
+                document = self._documents[doc_id]
+                if document.spill_dir is None:
+                    document.spill_dir = tempfile.mkdtemp(prefix="cv-")
+                    with open(os.path.join(document.spill_dir, _safe_name(document.name)), "wb") as f:
+                        f.write(document.data)
+                spill_path = os.path.join(document.spill_dir, _safe_name(document.name))
+            yield spill_path
+        finally:
+            self.release(doc_id)
+
+class SessionDocument:
+    """
+    Reference to a stored document held by one browser session.
+
+    The reference is released explicitly when the session replaces or clears
+    its upload, or when the session state holding this object is discarded.
+    """
+
+    def __init__(self, store: DocumentStore, data: bytes, name: str):
+        self.doc_id = store.acquire(data, name)
+        self.name = name
+        self._finalizer = weakref.finalize(self, store.release, self.doc_id)
+
+    def release(self):
+        self._finalizer()
+
+def _safe_name(name: str) -> str:
+    """File name without path separators or unusual characters"""
+    return re.sub(r"[^\w.\-]", "_", os.path.basename(name)) or "document.pdf"
+
+_document_store = DocumentStore()
+
+def get_document_store() -> DocumentStore:
+    """The process-wide document store"""
+    return _document_store
+
+def hold_session_document(session_state, data: bytes, name: str) -> str:
+    """
+    Make an upload the session's current document, releasing the previous one.
+
+    Args:
+        session_state: Streamlit session state
+        data: PDF bytes of the upload
+        name: Original file name
+
+    Returns:
+        Document id of the current upload
+    """
+    current: Optional[SessionDocument] = session_state.get("document")
+    doc_id = hashlib.sha256(data).hexdigest()
+    if current is not None and current.doc_id == doc_id:
+        return doc_id
+    session_state.document = SessionDocument(_document_store, data, name)
+    if current is not None:
+        current.release()
+    return doc_id
+
+def release_session_document(session_state):
+    """Release the session's current document, if any"""
+    current: Optional[SessionDocument] = session_state.get("document")
+    if current is not None:
+        current.release()
+        session_state.document = None
@@ -0,0 +1,294 @@
+"""
+Parallel page-level text extraction with layout-aware CV sectioning.
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+import multiprocessing.util
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import (
+    EXTRACTION_WORKERS,
+    EXTRACTION_PARALLEL_MIN_PAGES,
+    EXTRACTION_PAGES_PER_TASK,
+    EXTRACTION_HEADING_SIZE_RATIO,
+)
+from documents import get_document_store
+from metrics import span
+from utils import (
+    PdfSource,
+    describe_pdf,
+    detect_section_heading,
+    get_pdf_page_count,
+    open_pdf,
+)
+
+# Bump whenever extraction or sectioning changes so stored candidates are re-extracted
+EXTRACTION_VERSION = "2"
+
+# Bold flag of a PyMuPDF text span
+BOLD_FLAG = 16
+
+_extraction_executor = None
+_extraction_lock = threading.Lock()
+
+def detect_layout_heading(line: dict, heading_size: Optional[float]) -> Optional[str]:
+    """
+    Map an extracted line to a section name if it looks like a heading.
+
+    Known section keywords are mapped to their section. Another short line
+    only starts a section, named after its own text, when it is set clearly
+    larger than the keyword headings found so far; bold or capitalized lines
+    such as employers and job titles stay in the current section.
+
+    Args:
+        line: Extracted line with "text" and "size"
+        heading_size: Largest font size of the keyword headings found so far,
+            or None if there was none yet
+
+    Returns:
+        Section name, or None if the line is not a heading
+    """
+    text = line["text"]
+    section = detect_section_heading(text)
+    if section or heading_size is None:
+        return section
+    if len(text) > 40 or len(text.split()) > 4 or any(char.isdigit() for char in text):
+        return None
+    if line["size"] >= heading_size * EXTRACTION_HEADING_SIZE_RATIO:
+        return text.strip(" :•-").casefold() or None
+    return None
+
+def _extract_page(page, page_num: int) -> dict:
+    """Text lines of a page with their font size, weight, block and position"""
+    lines = []
+    for block_num, block in enumerate(page.get_text("dict", sort=True)["blocks"]):
+        if block.get("type") != 0:
+            continue
+        for raw_line in block["lines"]:
+            spans = [item for item in raw_line["spans"] if item["text"].strip()]
+            if not spans:
+                continue
+            lines.append({
+                "text": " ".join("".join(item["text"] for item in spans).split()),
+                "size": round(max(item["size"] for item in spans), 1),
+                "bold": all(item["flags"] & BOLD_FLAG or "bold" in item["font"].lower() for item in spans),
+                "block": block_num,
+                "bbox": [round(value, 1) for value in raw_line["bbox"]],
+            })
+    return {"page": page_num, "lines": lines}
+
+def _extract_pages(pdf: PdfSource, page_nums: List[int]) -> List[dict]:
+    """Extract a range of pages; module-level so it can run in a worker process"""
+    with open_pdf(pdf) as doc:
+        return [_extract_page(doc.load_page(page_num), page_num) for page_num in page_nums]
+
+def _get_extraction_executor() -> ProcessPoolExecutor:
+    """Shared process pool for page extraction, created on first use"""
+    global _extraction_executor
+    with _extraction_lock:
+        if _extraction_executor is None:
+            # Spawned workers do not inherit this process's threads, locks or
+            # open API connections
+            _extraction_executor = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+            # Inside a job worker process the interpreter exit hooks that stop
+            # the pool never run, and the worker would wait on it forever. It
+            # has to stop before the pool's own queues are closed at exit
+            multiprocessing.util.Finalize(
+                _extraction_executor, _extraction_executor.shutdown, exitpriority=20
+            )
+        return _extraction_executor
+
+def _discard_extraction_executor(executor: Optional[ProcessPoolExecutor]):
+    """Replace a broken pool on next use, unless another caller already did"""
+    global _extraction_executor
+    with _extraction_lock:
+        if executor is not None and _extraction_executor is executor:
+            _extraction_executor = None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _reset_extraction_executor():
+    """
+    Forget the parent's pool in a forked child, e.g. a batch or job worker.
+
+    The child's copy of the pool has no manager thread, so submitting to it
+    would hang; the child creates its own pool on first use instead.
+    """
+    global _extraction_executor, _extraction_lock
+    _extraction_executor = None
+    _extraction_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_extraction_executor)
+
+@contextmanager
+def _worker_source(pdf: PdfSource) -> Iterator[str]:
+    """Path workers can open, so large in-memory PDFs are not pickled once per task"""
+    if isinstance(pdf, bytes):
+        with get_document_store().path(pdf) as path:
+            yield path
+    else:
+        yield pdf
+
+def iter_pdf_pages(pdf: PdfSource, workers: int = EXTRACTION_WORKERS) -> Iterator[dict]:
+    """
+    Extract the pages of a PDF, in order, as soon as each one is ready.
+
+    Documents of EXTRACTION_PARALLEL_MIN_PAGES pages or more are fanned out
+    across a process pool in ranges of EXTRACTION_PAGES_PER_TASK pages, so
+    wall time scales with the number of cores; shorter ones are extracted
+    in-process, where a pool would cost more than it saves. If a worker dies,
+    e.g. on a crash or out of memory, the pool is replaced for later calls and
+    the remaining pages of this document are extracted in-process.
+
+    Args:
+        pdf: Path to the PDF file or its bytes
+        workers: Number of worker processes; 1 extracts in-process
+
+    Yields:
+        Page dictionaries with "page" and "lines"
+    """
+    page_count = get_pdf_page_count(pdf)
+    if workers <= 1 or page_count < EXTRACTION_PARALLEL_MIN_PAGES:
+        with open_pdf(pdf) as doc:
+            for page_num in range(page_count):
+                yield _extract_page(doc.load_page(page_num), page_num)
+        return
+
+    next_page = 0
+    executor = None
+    try:
+        with _worker_source(pdf) as source:
+            executor = _get_extraction_executor()
+            futures = [
+                executor.submit(_extract_pages, source, list(range(start, min(start + EXTRACTION_PAGES_PER_TASK, page_count))))
+                for start in range(0, page_count, EXTRACTION_PAGES_PER_TASK)
+            ]
+            try:
+                for future in futures:
+                    for page in future.result():
+                        yield page
+                        next_page += 1
+            finally:
+                # Stop pending ranges if the consumer stops early
+                for future in futures:
+                    future.cancel()
+    except BrokenProcessPool as e:
+        logging.error(f"Page extraction pool broke on {describe_pdf(pdf)}, extracting in-process: {e}")
+        _discard_extraction_executor(executor)
+        with open_pdf(pdf) as doc:
+            for page_num in range(next_page, page_count):
+                yield _extract_page(doc.load_page(page_num), page_num)
+
+def iter_section_lines(pages: Iterable[dict]) -> Iterator[Tuple[str, str]]:
+    """
+    Assign each extracted line to its CV section, in reading order.
+
+    Text before the first heading goes to the "perfil" section, and words
+    hyphenated across lines are re-joined. Sections start at known section
+    keywords, or at lines clearly larger than those keyword headings (see
+    detect_layout_heading).
+
+    Args:
+        pages: Extracted pages in page order
+
+    Yields:
+        (section, line text) pairs
+    """
+    section = "perfil"
+    heading_size: Optional[float] = None
+    pending: Optional[Tuple[str, str]] = None
+    for page in pages:
+        for line in page["lines"]:
+            heading = detect_layout_heading(line, heading_size)
+            if heading:
+                if detect_section_heading(line["text"]):
+                    heading_size = max(heading_size or 0.0, line["size"])
+                if pending:
+                    yield pending
+                    pending = None
+                section = heading
+                continue
+            text = line["text"]
+            if pending and pending[0] == section and pending[1][-2:-1].isalpha() \
+                    and pending[1].endswith("-") and text[:1].isalpha():
+                pending = (section, pending[1][:-1] + text)
+                continue
+            if pending:
+                yield pending
+            pending = (section, text)
+    if pending:
+        yield pending
+
+def chunk_section_lines(lines: Iterable[Tuple[str, str]], max_chars: int) -> Iterator[Dict[str, str]]:
+    """
+    Group sectioned lines into chunks that never span two sections.
+
+    Args:
+        lines: (section, line text) pairs in reading order
+        max_chars: Maximum characters per chunk
+
+    Yields:
+        Chunks as dictionaries with "section" and "text"
+    """
+    section = None
+    current: List[str] = []
+    size = 0
+    for line_section, text in lines:
+        if current and (line_section != section or size + len(text) > max_chars):
+            yield {"section": section, "text": "\n".join(current)}
+            current, size = [], 0
+        section = line_section
+        current.append(text)
+        size += len(text) + 1
+    if current:
+        yield {"section": section, "text": "\n".join(current)}
+
+def iter_cv_chunks(pdf: PdfSource, max_chars: int) -> Iterator[Dict[str, str]]:
+    """
+    Stream section-aware chunks of a CV while later pages are still being extracted.
+
+    Args:
+        pdf: Path to the CV PDF file or its bytes
+        max_chars: Maximum characters per chunk
+
+    Yields:
+        Chunks as dictionaries with "section" and "text"
+    """
+    yield from chunk_section_lines(iter_section_lines(iter_pdf_pages(pdf)), max_chars)
+
+def extract_cv(pdf: PdfSource) -> dict:
+    """
+    Extract the text of a CV together with its layout-aware sections.
+
+    Args:
+        pdf: Path to the CV PDF file or its bytes
+
+    Returns:
+        Dictionary with "page_count", the plain "text", the ordered "sections"
+        mapping and the extracted "pages"; empty if extraction fails
+    """
+    try:
+        with span("page_extraction") as attributes:
+            pages = list(iter_pdf_pages(pdf))
+            attributes["pages"] = len(pages)
+        sections: Dict[str, List[str]] = OrderedDict()
+        for section, text in iter_section_lines(pages):
+            sections.setdefault(section, []).append(text)
+        return {
+            "page_count": len(pages),
+            "text": "\n".join(line["text"] for page in pages for line in page["lines"]),
+            "sections": OrderedDict((name, "\n".join(lines)) for name, lines in sections.items()),
+            "pages": pages,
+        }
+    except Exception as e:
+        logging.error(f"Error extracting CV structure from {describe_pdf(pdf)}: {e}")
+        return {"page_count": 0, "text": "", "sections": OrderedDict(), "pages": []}
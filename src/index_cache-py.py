@@ -0,0 +1,232 @@
+"""
+Persistent, content-addressed cache for the PDFSearchTool embedding index.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import List, Tuple
+
+from config import (
+    init_chroma,
+    EMBEDDING_MODEL_NAME,
+    INDEX_CACHE_DIR,
+    INDEX_CACHE_MAX_BYTES,
+    INDEX_CACHE_MAX_ENTRIES,
+    INDEX_CACHE_GRACE_SECONDS,
+)
+from metrics import span
+from utils import compute_file_hash
+
+CACHED_PDF_NAME = "cv.pdf"
+METADATA_NAME = "index.json"
+# Marker files of the requests building or opening an entry
+IN_USE_PREFIX = "in_use."
+
+_cache_lock = threading.Lock()
+
+def get_index_key(cv_path: str, embedding_model: str = EMBEDDING_MODEL_NAME) -> str:
+    """
+    Build the cache key for a CV from its content hash and the embedding model.
+
+    Args:
+        cv_path: Path to the CV PDF file
+        embedding_model: Name of the embedding model used for the index
+
+    Returns:
+        Hex-encoded cache key
+    """
+    content_hash = compute_file_hash(cv_path)
+    return hashlib.sha256(f"{content_hash}:{embedding_model}".encode("utf-8")).hexdigest()
+
+def _embedchain_config(entry_dir: str, key: str) -> dict:
+    """Embedchain configuration pointing the tool at the cached Chroma collection"""
+    return {
+        "embedder": {
+            "provider": "openai",
+            "config": {"model": EMBEDDING_MODEL_NAME},
+        },
+        "vectordb": {
+            "provider": "chroma",
+            "config": {
+                "collection_name": f"cv-{key[:32]}",
+                "dir": os.path.join(entry_dir, "chroma"),
+                "allow_reset": False,
+            },
+        },
+    }
+
+def _dir_size(path: str) -> int:
+    """Total size in bytes of all files below a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _last_used(entry_dir: str) -> float:
+    """
+    Time an entry was last built, opened or used.
+
+    Entries still being built have no metadata yet, so their in-use markers
+    and the directory itself count as well.
+
+    Args:
+        entry_dir: Directory of the cache entry
+
+    Returns:
+        Most recent modification time, in seconds since the epoch
+    """
+    times = [os.path.getmtime(entry_dir)]
+    for name in os.listdir(entry_dir):
+        if name == METADATA_NAME or name.startswith(IN_USE_PREFIX):
+            try:
+                times.append(os.path.getmtime(os.path.join(entry_dir, name)))
+            except OSError:
+                pass
+    return max(times)
+
+def _list_entries() -> List[Tuple[float, int, str]]:
+    """Return (last_used, size, path) for every cache entry"""
+    entries = []
+    if not os.path.isdir(INDEX_CACHE_DIR):
+        return entries
+    for name in os.listdir(INDEX_CACHE_DIR):
+        entry_dir = os.path.join(INDEX_CACHE_DIR, name)
+        if not os.path.isdir(entry_dir):
+            continue
+        try:
+            entries.append((_last_used(entry_dir), _dir_size(entry_dir), entry_dir))
+        except OSError:
+            # Removed by another process while listing
+            continue
+    return entries
+
+def _process_alive(pid: int) -> bool:
+    """Whether a process with this id is running on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def _is_in_use(entry_dir: str) -> bool:
+    """Whether a running request is building or opening an entry"""
+    try:
+        names = os.listdir(entry_dir)
+    except OSError:
+        return False
+    for name in names:
+        if name.startswith(IN_USE_PREFIX):
+            # Markers of processes that crashed mid-build do not count
+            pid = name[len(IN_USE_PREFIX):].split("-")[0]
+            if pid.isdigit() and _process_alive(int(pid)):
+                return True
+    return False
+
+def _mark_in_use(entry_dir: str) -> str:
+    """Create this request's in-use marker in an entry; returns its path"""
+    marker = os.path.join(entry_dir, f"{IN_USE_PREFIX}{os.getpid()}-{threading.get_ident()}")
+    with open(marker, "w"):
+        pass
+    return marker
+
+def _release(marker: str):
+    """Remove an in-use marker"""
+    try:
+        os.remove(marker)
+    except OSError:
+        pass
+
+def evict_index_cache(keep: str = None):
+    """
+    Evict least recently used index entries until the cache fits its limits.
+
+    Entries that a request is building or opening, and entries used within
+    the last INDEX_CACHE_GRACE_SECONDS, are skipped even if the cache stays
+    over its limits. Markers left by processes that are no longer running do
+    not protect their entry.
+
+    Args:
+        keep: Cache key that must never be evicted (the one in use)
+    """
+    with _cache_lock:
+        entries = sorted(_list_entries())
+        total_size = sum(size for _, size, _ in entries)
+        count = len(entries)
+        cutoff = time.time() - INDEX_CACHE_GRACE_SECONDS
+        for last_used, size, entry_dir in entries:
+            if total_size <= INDEX_CACHE_MAX_BYTES and count <= INDEX_CACHE_MAX_ENTRIES:
+                break
+            if keep and os.path.basename(entry_dir) == keep:
+                continue
+            # Sorted by last use, so every remaining entry is recent as well
+            if last_used >= cutoff:
+                break
+            if _is_in_use(entry_dir):
+                continue
+            try:
+                shutil.rmtree(entry_dir)
+                total_size -= size
+                count -= 1
+                logging.info(f"Evicted PDF index cache entry: {entry_dir}")
+            except Exception as e:
+                logging.error(f"Error evicting PDF index cache entry {entry_dir}: {e}")
+
+def get_pdf_tool(cv_path: str):
+    """
+    Get a PDFSearchTool for a CV, reusing the cached embedding index if present.
+
+    The PDF is copied into a directory named after its content hash, so the
+    chunk ids embedchain derives from the source path stay stable across runs
+    and already embedded chunks are skipped instead of re-embedded.
+
+    Args:
+        cv_path: Path to the CV PDF file
+
+    Returns:
+        PDFSearchTool instance backed by the cached index
+    """
+    from crewai_tools import PDFSearchTool
+    init_chroma()
+
+    key = get_index_key(cv_path)
+    entry_dir = os.path.join(INDEX_CACHE_DIR, key)
+    cached_pdf = os.path.join(entry_dir, CACHED_PDF_NAME)
+    metadata_path = os.path.join(entry_dir, METADATA_NAME)
+
+    with _cache_lock:
+        hit = os.path.exists(metadata_path)
+        os.makedirs(entry_dir, exist_ok=True)
+        if not os.path.exists(cached_pdf):
+            shutil.copyfile(cv_path, cached_pdf)
+        # Written before building, so concurrent requests never evict it
+        marker = _mark_in_use(entry_dir)
+
+    try:
+        start_time = time.time()
+        with span("pdf_index", cache_hit=hit):
+            pdf_tool = PDFSearchTool(pdf=cached_pdf, config=_embedchain_config(entry_dir, key))
+        elapsed = round(time.time() - start_time, 2)
+
+        with _cache_lock:
+            if hit:
+                os.utime(metadata_path)
+            else:
+                with open(metadata_path, "w") as f:
+                    json.dump({"key": key, "embedding_model": EMBEDDING_MODEL_NAME, "created": time.time()}, f)
+    finally:
+        _release(marker)
+
+    logging.info(f"PDF index cache {'hit' if hit else 'miss'} for {cv_path} ({elapsed}s)")
+    evict_index_cache(keep=key)
+    return pdf_tool
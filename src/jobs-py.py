@@ -0,0 +1,288 @@
+"""
+Background job queue that runs CV analyses outside the Streamlit script thread.
+"""
+
+import time
+import queue
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import metrics
+from config import (
+    JOB_WORKERS,
+    JOB_QUEUE_SIZE,
+    JOB_MAX_PER_USER,
+    JOB_EXECUTOR,
+    JOB_RESULT_TTL,
+)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, ERROR, CANCELLED)
+
+class JobRejected(Exception):
+    """Raised when a job cannot be accepted because of backpressure or user limits"""
+
+class JobCancelled(Exception):
+    """Raised inside a running analysis to stop it at the next agent step"""
+
+def _analyze(cv: Any, descripcion: str, event_queue: Any = None) -> dict:
+    """Run one analysis; module-level so it can execute in a worker process"""
+    # Imported here so only workers load the crew stack
+    from pipeline import analyze_cv
+    return analyze_cv(cv, descripcion, event_queue=event_queue)
+
+class JobEventReader:
+    """Queue-like cursor over a job's events, so readers can start from the beginning"""
+
+    def __init__(self, job: "Job"):
+        self._job = job
+        self._position = 0
+
+    def get(self, timeout: Optional[float] = None) -> dict:
+        event = self._job.wait_event(self._position, timeout)
+        if event is None:
+            raise queue.Empty
+        self._position += 1
+        return event
+
+class Job:
+    """
+    One submitted analysis and the log of events it has produced.
+
+    The job is passed to the pipeline as its event queue: agent steps, task
+    outputs and, when streaming, tokens are appended to the log, which any
+    number of readers can replay from the start, e.g. after a page refresh.
+    Steps and task outputs also give a cancelled job the point to stop at.
+    """
+
+    def __init__(self, user_id: str, streaming: bool):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.streaming = streaming
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = False
+        self.future: Optional[Future] = None
+        self._events: List[dict] = []
+        self._condition = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def put(self, event: dict):
+        """Append an event; stops the analysis at its next step once cancelled"""
+        with self._condition:
+            if self.cancel_requested:
+                # Token callbacks swallow exceptions, but step and task callbacks
+                # propagate them and abort the crew
+                if event.get("type") in ("step", "task_done"):
+                    raise JobCancelled(f"Job {self.id} was cancelled")
+                return
+            if self.done or (event.get("type") == "token" and not self.streaming):
+                return
+            self._events.append(event)
+            self._condition.notify_all()
+
+    def wait_event(self, position: int, timeout: Optional[float] = None) -> Optional[dict]:
+        """Event at a position of the log, waiting up to timeout for it to arrive"""
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._events) > position, timeout)
+            return self._events[position] if len(self._events) > position else None
+
+    def subscribe(self) -> JobEventReader:
+        """Reader over all the job's events, starting from the first one"""
+        return JobEventReader(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns whether it did"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.done, timeout)
+
+    def _finish(self, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._condition:
+            if self.done:
+                return
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            event = {"type": "done", "result": result} if status == DONE else {"type": "error", "error": error}
+            self._events.append(event)
+            self.status = status
+            self._condition.notify_all()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status summary of the job"""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+        }
+
+class JobManager:
+    """
+    Bounded pool of background analysis workers.
+
+    Jobs beyond the running workers wait in a queue of at most max_queued
+    entries, and each user may have at most max_per_user unfinished jobs;
+    submissions over either limit are rejected instead of piling up. Finished
+    jobs are kept for result_ttl seconds so clients can reconnect to them.
+
+    With the "process" executor analyses run in separate worker processes;
+    their results are still available but tokens and steps are not streamed.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE,
+                 max_per_user: int = JOB_MAX_PER_USER, executor: str = JOB_EXECUTOR,
+                 result_ttl: int = JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self.result_ttl = result_ttl
+        self.use_processes = executor == "process"
+        if self.use_processes:
+            # Forking the multi-threaded server could copy locks held by other
+            # threads and share its open API connections
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, cv: Any, descripcion: str, user_id: str, streaming: bool = True) -> Job:
+        """
+        Queue an analysis.
+
+        Args:
+            cv: Path to the CV PDF file or its bytes
+            descripcion: Requirements text for the vacancy
+            user_id: Identifier of the submitting user, for per-user limits
+            streaming: Whether to record tokens and steps as they are produced
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobRejected: If the queue is full or the user has too many jobs
+        """
+        self._purge()
+        with self._lock:
+            active = [job for job in self._jobs.values() if not job.done]
+            if len(active) >= self.workers + self.max_queued:
+                metrics.increment("jobs_rejected_total", reason="queue_full")
+                raise JobRejected("Hay demasiados análisis en curso. Intenta de nuevo en unos minutos.")
+            if sum(job.user_id == user_id for job in active) >= self.max_per_user:
+                metrics.increment("jobs_rejected_total", reason="user_limit")
+                raise JobRejected(
+                    f"Ya tienes {self.max_per_user} análisis en curso. Espera a que terminen o cancela alguno."
+                )
+            job = Job(user_id, streaming=streaming and not self.use_processes)
+            self._jobs[job.id] = job
+
+        if self.use_processes:
+            job.future = self._executor.submit(_analyze, cv, descripcion)
+        else:
+            job.future = self._executor.submit(self._run_in_thread, job, cv, descripcion)
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        metrics.increment("jobs_submitted_total")
+        logging.info(f"Queued analysis job {job.id} for user {user_id}")
+        return job
+
+    def _run_in_thread(self, job: Job, cv: Any, descripcion: str) -> dict:
+        if job.cancel_requested:
+            raise JobCancelled(f"Job {job.id} was cancelled")
+        job.status = RUNNING
+        job.started = time.time()
+        metrics.observe("job_queue_wait_seconds", job.started - job.created)
+        # The job is the event queue even without streaming, so cancellation
+        # can stop the crew at its next step
+        return _analyze(cv, descripcion, event_queue=job)
+
+    def _on_done(self, job: Job, future: Future):
+        if future.cancelled() or job.cancel_requested:
+            job._finish(CANCELLED, error="Análisis cancelado")
+        elif future.exception() is not None:
+            logging.error(f"Analysis job {job.id} failed: {future.exception()}")
+            job._finish(ERROR, error=str(future.exception()))
+        else:
+            job._finish(DONE, result=future.result())
+        metrics.increment("jobs_finished_total", status=job.status)
+        logging.info(f"Analysis job {job.id} finished with status {job.status}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id, or None if unknown or expired"""
+        self._purge()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, user_id: Optional[str] = None) -> List[Job]:
+        """Known jobs, optionally only those of one user, oldest first"""
+        self._purge()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if user_id is None or job.user_id == user_id]
+        return sorted(jobs, key=lambda job: job.created)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job.
+
+        Queued jobs are removed from the queue. Running thread jobs stop at the
+        next agent step; an LLM call already in flight still completes. Running
+        process jobs finish in the background and their result is discarded.
+        A running job keeps its worker, and counts against the queue and user
+        limits, until it has actually stopped.
+
+        Args:
+            job_id: Id of the job
+
+        Returns:
+            Whether the job was still unfinished
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_requested = True
+        # A queued future is cancelled here; a running one is reported as
+        # cancelled by _on_done once it stops
+        if job.future is not None:
+            job.future.cancel()
+        logging.info(f"Cancelled analysis job {job_id}")
+        return True
+
+    def _purge(self):
+        """Forget finished jobs older than the result TTL"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """The process-wide job manager, created on first use"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
@@ -0,0 +1,115 @@
+"""
+Fast offline language detection used to decide whether the translator agent is needed.
+"""
+
+import re
+import time
+import logging
+from typing import Dict, Tuple
+
+from config import LANGUAGE_MIN_CONFIDENCE
+
+UNKNOWN_LANGUAGE = "unknown"
+
+# Most frequent function words per language; they dominate any running text
+STOPWORDS: Dict[str, frozenset] = {
+    "es": frozenset("""
+        de la que el en y a los del se las por un para con no una su al lo como
+        más pero sus le ya o este sí porque esta entre cuando muy sin sobre también
+        me hasta hay donde quien desde todo nos durante todos uno les ni contra otros
+        ese eso ante ellos e esto mí antes algunos qué unos yo otro otras otra él
+        experiencia años conocimientos manejo desarrollo gestión universidad
+    """.split()),
+    "en": frozenset("""
+        the of and to in a is that for it as was with be by on not he i this are
+        or his from at which but have an they you were her she there been has their
+        one we all will would can more if no out so said what up its about into than
+        experience years skills knowledge development management university
+    """.split()),
+    "pt": frozenset("""
+        de a o que e do da em um para é com não uma os no se na por mais as dos
+        como mas foi ao ele das tem à seu sua ou ser quando muito há nos já está eu
+        também só pelo pela até isso ela entre era depois sem mesmo aos ter seus
+        experiência anos conhecimentos desenvolvimento gestão universidade
+    """.split()),
+    "fr": frozenset("""
+        de la le et les des en un du une que est pour qui dans par plus pas au sur
+        ne se ce il sont avec ou son mais comme on tout nous sa leur été aussi
+        expérience ans compétences connaissances développement gestion université
+    """.split()),
+    "de": frozenset("""
+        der die und in den von zu das mit sich des auf für ist im dem nicht ein
+        eine als auch es an werden aus er hat dass sie nach wird bei einer um am
+        erfahrung jahre kenntnisse entwicklung universität
+    """.split()),
+    "it": frozenset("""
+        di e il la che in un a per è una sono non del della con i le si da al
+        come gli lo più nel ma anche alla ha dei delle questo
+        esperienza anni competenze conoscenze sviluppo gestione università
+    """.split()),
+}
+
+# Characters that only appear in Spanish among the supported languages
+SPANISH_MARKERS = re.compile(r"[ñ¿¡]")
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def detect_language(text: str, max_words: int = 2000) -> Tuple[str, float]:
+    """
+    Detect the dominant language of a text from stopword frequencies.
+
+    Args:
+        text: Text to classify
+        max_words: Number of leading words inspected
+
+    Returns:
+        Tuple of ISO 639-1 language code (or "unknown") and confidence in [0, 1]
+    """
+    words = [word.lower() for word in WORD_PATTERN.findall(text[: max_words * 12])][:max_words]
+    if not words:
+        return UNKNOWN_LANGUAGE, 0.0
+
+    scores = {language: 0 for language in STOPWORDS}
+    for word in words:
+        for language, stopwords in STOPWORDS.items():
+            if word in stopwords:
+                scores[language] += 1
+    scores["es"] += 3 * len(SPANISH_MARKERS.findall(text[: max_words * 12]))
+
+    total = sum(scores.values())
+    if total == 0:
+        return UNKNOWN_LANGUAGE, 0.0
+    language, best = max(scores.items(), key=lambda item: item[1])
+    confidence = best / total
+    if confidence < LANGUAGE_MIN_CONFIDENCE:
+        return UNKNOWN_LANGUAGE, round(confidence, 3)
+    return language, round(confidence, 3)
+
+def plan_translation(cv_text: str, descripcion: str) -> dict:
+    """
+    Decide whether the crew needs the translator agent.
+
+    The translator is skipped when the CV is Spanish and the requirements are
+    either Spanish or carry no language signal (e.g. a bare list of tools).
+
+    Args:
+        cv_text: Text extracted from the CV
+        descripcion: Requirements text for the vacancy
+
+    Returns:
+        Dictionary with the detected languages, their confidences, whether the
+        translator is needed and the detection time in seconds
+    """
+    start_time = time.perf_counter()
+    cv_language, cv_confidence = detect_language(cv_text)
+    descripcion_language, descripcion_confidence = detect_language(descripcion)
+    use_translator = not (cv_language == "es" and descripcion_language in ("es", UNKNOWN_LANGUAGE))
+    decision = {
+        "cv_language": cv_language,
+        "cv_confidence": cv_confidence,
+        "descripcion_language": descripcion_language,
+        "descripcion_confidence": descripcion_confidence,
+        "use_translator": use_translator,
+        "detection_time": round(time.perf_counter() - start_time, 6),
+    }
+    logging.info(f"Language detection: {decision}")
+    return decision
@@ -0,0 +1,203 @@
+"""
+Process-wide pooled LLM client shared by all agents and requests.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_openai import ChatOpenAI
+
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_API_BASE,
+    OPENAI_MODEL_NAME,
+    EMBEDDING_MODEL_NAME,
+    LLM_TEMPERATURE,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_REQUEST_TIMEOUT,
+    LLM_POOL_TIMEOUT,
+    LLM_MAX_RETRIES,
+)
+import metrics
+from prompts import check_budget, count_tokens
+
+_llm = None
+_http_client = None
+_embedding_client = None
+_llm_lock = threading.Lock()
+_usage_lock = threading.Lock()
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the shared HTTP client used for OpenAI requests.
+
+    Connections are kept alive between requests, and requests beyond
+    LLM_MAX_CONNECTIONS wait for a free connection instead of opening new ones.
+
+    Returns:
+        The process-wide httpx client
+    """
+    global _http_client
+    with _llm_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, pool=LLM_POOL_TIMEOUT),
+            )
+            logging.info(f"Created pooled HTTP client (max connections: {LLM_MAX_CONNECTIONS})")
+        return _http_client
+
+def get_llm() -> ChatOpenAI:
+    """
+    Get the shared chat model client, creating it on first use.
+
+    Returns:
+        The process-wide ChatOpenAI instance
+    """
+    global _llm
+    http_client = get_http_client()
+    with _llm_lock:
+        if _llm is None:
+            kwargs = {}
+            if OPENAI_API_BASE:
+                kwargs["base_url"] = OPENAI_API_BASE
+            _llm = ChatOpenAI(
+                model_name=OPENAI_MODEL_NAME,
+                temperature=LLM_TEMPERATURE,
+                api_key=OPENAI_API_KEY,
+                http_client=http_client,
+                max_retries=LLM_MAX_RETRIES,
+                **kwargs,
+            )
+            logging.info(f"Created pooled LLM client for {OPENAI_MODEL_NAME}")
+        return _llm
+
+def embed_texts(texts: List[str], batch_size: int = 100) -> List[List[float]]:
+    """
+    Embed texts with the configured embedding model over the pooled connections.
+
+    Args:
+        texts: Texts to embed
+        batch_size: Maximum number of texts per API request
+
+    Returns:
+        One embedding vector per text, in input order
+    """
+    global _embedding_client
+    from openai import OpenAI
+
+    http_client = get_http_client()
+    with _llm_lock:
+        if _embedding_client is None:
+            _embedding_client = OpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_API_BASE or None,
+                http_client=http_client,
+                max_retries=LLM_MAX_RETRIES,
+            )
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        start_time = time.perf_counter()
+        response = _embedding_client.embeddings.create(model=EMBEDDING_MODEL_NAME, input=batch)
+        metrics.observe("embedding_call_duration_seconds", time.perf_counter() - start_time)
+        metrics.increment("embedding_calls_total")
+        metrics.increment("embedding_tokens_total", getattr(response.usage, "total_tokens", 0))
+        embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    return embeddings
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback that records latency, tokens and errors of every LLM call.
+
+    Prompts are checked against the token budget before they are sent, and
+    when a usage dictionary is given the call's tokens are added to it, which
+    totals them per analysis.
+    """
+
+    def __init__(self, agent_role: str, usage: Optional[Dict[str, int]] = None):
+        self.agent_role = agent_role
+        self.usage = usage
+        self._starts = {}
+        self._streamed_tokens = {}
+        self._prompt_tokens = {}
+
+    def _check_prompt(self, run_id: UUID, prompt: str):
+        prompt_tokens = count_tokens(prompt)
+        self._prompt_tokens[run_id] = prompt_tokens
+        if not check_budget(prompt_tokens, label=self.agent_role):
+            metrics.increment("llm_prompt_budget_exceeded_total", agent=self.agent_role)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+        self._check_prompt(run_id, "\n".join(prompts))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+        self._check_prompt(run_id, "\n".join(str(message.content) for batch in messages for message in batch))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed_tokens[run_id] = self._streamed_tokens.get(run_id, 0) + 1
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        latency = time.perf_counter() - self._starts.pop(run_id, time.perf_counter())
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        # Streaming responses carry no usage block, so fall back to the counted
+        # prompt and to the number of streamed chunks
+        counted_prompt_tokens = self._prompt_tokens.pop(run_id, 0)
+        streamed_tokens = self._streamed_tokens.pop(run_id, 0)
+        prompt_tokens = usage.get("prompt_tokens") or counted_prompt_tokens
+        completion_tokens = usage.get("completion_tokens") or streamed_tokens
+        metrics.observe("llm_call_duration_seconds", latency, agent=self.agent_role)
+        metrics.increment("llm_calls_total", agent=self.agent_role)
+        metrics.increment("llm_prompt_tokens_total", prompt_tokens, agent=self.agent_role)
+        metrics.increment("llm_completion_tokens_total", completion_tokens, agent=self.agent_role)
+        if self.usage is not None:
+            with _usage_lock:
+                self.usage["prompt_tokens"] = self.usage.get("prompt_tokens", 0) + prompt_tokens
+                self.usage["completion_tokens"] = self.usage.get("completion_tokens", 0) + completion_tokens
+                self.usage["calls"] = self.usage.get("calls", 0) + 1
+        metrics.log_event(
+            "llm_call",
+            agent=self.agent_role,
+            model=OPENAI_MODEL_NAME,
+            duration_ms=round(latency * 1000, 2),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts.pop(run_id, None)
+        self._streamed_tokens.pop(run_id, None)
+        self._prompt_tokens.pop(run_id, None)
+        metrics.increment("llm_errors_total", agent=self.agent_role, error=type(error).__name__)
+
+def get_agent_llm(callbacks: Sequence[BaseCallbackHandler] = (), streaming: bool = False) -> ChatOpenAI:
+    """
+    Get a chat model for one agent that shares the pooled client.
+
+    The model is a shallow copy of the shared client, so it reuses its HTTP
+    connections while carrying its own callbacks.
+
+    Args:
+        callbacks: LangChain callback handlers for the agent's calls
+        streaming: Whether tokens are streamed to the callbacks
+
+    Returns:
+        ChatOpenAI instance for the agent
+    """
+    llm = get_llm()
+    if not callbacks and not streaming:
+        return llm
+    return llm.copy(update={"callbacks": list(callbacks), "streaming": streaming})
@@ -4,24 +4,117 @@ Main application entry point for CV Analyzer.
 This script initializes and runs the Streamlit application.
 """
 
+import time
+
+# Measured before any other import so the startup budget covers them too
+SCRIPT_START = time.perf_counter()
+
+import uuid
 import logging
 import streamlit as st
-import time
-import os
 
-from config import setup_logging, DOCS_FOLDER
-from utils import setup_folders, delete_docs, get_pdf_previews
-from ui import setup_ui
-from agents import create_crew
+from config import (
+    setup_logging,
+    STARTUP_BUDGET_MS,
+    STREAMING_ENABLED,
+    JOB_POLL_INTERVAL,
+    PREVIEW_THUMBNAIL_SCALE,
+    PREVIEW_FULL_SCALE,
+    PREVIEW_PAGE_SIZE,
+)
+from utils import iter_pdf_previews, get_pdf_page_count
+from documents import get_document_store, hold_session_document, release_session_document
+from ui import setup_ui, render_streaming_analysis
+from metrics import span, start_metrics_server
+from jobs import get_job_manager, JobRejected, CANCELLED
+
+def check_startup_budget():
+    """Log the time from script start to the rendered form and flag budget overruns"""
+    elapsed_ms = round((time.perf_counter() - SCRIPT_START) * 1000, 1)
+    if elapsed_ms > STARTUP_BUDGET_MS:
+        logging.warning(f"Startup took {elapsed_ms} ms, over the {STARTUP_BUDGET_MS} ms budget")
+    else:
+        logging.info(f"Startup took {elapsed_ms} ms")
+
+def get_query_param(name: str):
+    """Value of a URL query parameter, or None"""
+    return st.experimental_get_query_params().get(name, [None])[0]
+
+def set_query_params(**params):
+    """Update URL query parameters, dropping those set to None"""
+    current = {key: values[0] for key, values in st.experimental_get_query_params().items()}
+    current.update(params)
+    st.experimental_set_query_params(**{key: value for key, value in current.items() if value is not None})
+
+def get_client_id() -> str:
+    """Identifier of this browser tab, kept in the URL so it survives page refreshes"""
+    client_id = get_query_param("client")
+    if client_id is None:
+        client_id = uuid.uuid4().hex
+        set_query_params(client=client_id)
+    return client_id
+
+def show_analysis_job(job_id: str):
+    """Render a background analysis job, streaming its progress until it finishes"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        st.warning("El análisis solicitado ya no está disponible. Por favor, inícialo de nuevo.")
+        set_query_params(job=None)
+        return
+    
+    if not job.done and not job.cancel_requested and st.button("Cancelar análisis"):
+        get_job_manager().cancel(job_id)
+    if job.cancel_requested and not job.done:
+        # Poll instead of blocking so the script thread stays responsive
+        st.info("Cancelando el análisis...")
+        if not job.wait(JOB_POLL_INTERVAL):
+            st.rerun()
+    if job.status == CANCELLED:
+        st.info("El análisis fue cancelado.")
+        set_query_params(job=None)
+        return
+    
+    if job.streaming:
+        # Replays the events produced so far, so a refreshed page catches up
+        result = render_streaming_analysis(job.subscribe())
+    else:
+        # Poll instead of blocking, so the cancel button is handled while the job runs
+        with st.spinner('Procesando Hoja de Vida... Espera un momento por favor.'):
+            finished = job.wait(JOB_POLL_INTERVAL)
+        if not finished:
+            st.rerun()
+        if job.error:
+            raise RuntimeError(job.error)
+        result = job.result
+        st.success(f"**Análisis de la Hoja de Vida**:\n\n{result['analysis']}")
+        st.success(f"**Conclusión Final**:\n\n{result['evaluation']}")
+    
+    tokens = result.get("tokens", {})
+    if tokens.get("requirements_truncated"):
+        st.warning(
+            "Los requisitos del perfil eran demasiado extensos y se recortaron; "
+            "los últimos requisitos no se tuvieron en cuenta en el análisis."
+        )
+    if tokens.get("cv_truncated"):
+        st.warning(
+            "La hoja de vida era demasiado extensa y se recortaron partes de sus secciones; "
+            "el análisis puede no considerar toda la información del candidato."
+        )
+    st.write(f"**Tiempo de Procesamiento:** {result['processing_time']} segundos")
+    if result["cached"]:
+        st.caption(f"Resultado recuperado de la caché en {result['lookup_time']} segundos.")
 
 def main():
     """Main application flow"""
     try:
         # Setup application
         setup_logging()
-        setup_folders()
+        start_metrics_server()
         setup_ui()
         
+        client_id = get_client_id()
+        job_id = get_query_param("job")
+        
         # Initialize session state
         if "valid_docs" not in st.session_state:
             st.session_state.valid_docs = [False, False, False]
@@ -36,66 +129,64 @@ def main():
             height=300,
             max_chars=10000
         )
+        check_startup_budget()
         
         # Process inputs if available
         if uploaded_file and descripcion_input:
             logging.info(f"Document uploaded: {uploaded_file.name}")
             
-            # Save the file
-            cv_path = os.path.join(DOCS_FOLDER, uploaded_file.name)
-            with open(cv_path, "wb") as f:
-                f.write(uploaded_file.read())
+            # Keep the upload in memory for this session; nothing is written to disk here
+            with span("upload_write", bytes=uploaded_file.size):
+                doc_id = hold_session_document(st.session_state, uploaded_file.getvalue(), uploaded_file.name)
+                cv_data = get_document_store().get(doc_id)
             
-            # Display PDF preview
+            # Display PDF preview, rendering thumbnails a few pages at a time
             st.write("**Vista Previa de la Hoja de Vida del Candidato**")
-            images = get_pdf_previews(cv_path, scale=2.0)
-            for i, img in enumerate(images):
-                st.image(img, caption=f"Página {i+1}", use_column_width=True)
+            if st.session_state.get("preview_file") != uploaded_file.name:
+                st.session_state.preview_file = uploaded_file.name
+                st.session_state.preview_pages = PREVIEW_PAGE_SIZE
+            high_res = st.checkbox("Ver en alta resolución", value=False)
+            scale = PREVIEW_FULL_SCALE if high_res else PREVIEW_THUMBNAIL_SCALE
+            for page_num, img in iter_pdf_previews(cv_data, scale=scale, count=st.session_state.preview_pages):
+                st.image(img, caption=f"Página {page_num+1}", use_column_width=True)
+            if st.session_state.preview_pages < get_pdf_page_count(cv_data):
+                if st.button("Mostrar más páginas"):
+                    st.session_state.preview_pages += PREVIEW_PAGE_SIZE
+                    st.rerun()
             
-            # Analyze CV when button is clicked
+            # Queue the analysis when button is clicked; it runs in a background
+            # worker and survives reruns and page refreshes
             if st.button("Analizar Hoja de Vida"):
-                with st.spinner('Procesando Hoja de Vida... Espera un momento por favor.'):
-                    logging.info("Processing resume...")
-                    
-                    # Set up inputs for the crew
-                    job_application_inputs = {'descripcion': descripcion_input}
-                    
-                    # Create and run the crew
-                    crew, analysis_task, evaluation_task = create_crew(cv_path)
-                    
-                    # Track processing time
-                    start_time = time.time()
-                    crew.kickoff(inputs=job_application_inputs)
-                    end_time = time.time()
-                    
-                    # Display results
-                    st.success(f"**Análisis de la Hoja de Vida**:\n\n{analysis_task.output}")
-                    st.success(f"**Conclusión Final**:\n\n{evaluation_task.output}")
-                    st.write(f"**Tiempo de Procesamiento:** {round(end_time - start_time, 2)} segundos")
-                    
-                    # Cleanup
-                    delete_docs(DOCS_FOLDER)
+                logging.info("Processing resume...")
+                try:
+                    job = get_job_manager().submit(cv_data, descripcion_input, client_id, streaming=STREAMING_ENABLED)
+                    job_id = job.id
+                    set_query_params(job=job_id)
+                except JobRejected as e:
+                    st.warning(str(e))
                     
         # Handle missing inputs
         elif uploaded_file and not descripcion_input:
             st.error("Por favor, ingresa los requisitos del perfil en la caja de texto y presione Ctrl + Enter cuando esté listo.")
             logging.error("Description input is missing.")
-            delete_docs(DOCS_FOLDER)
             
         elif descripcion_input and not uploaded_file:
             st.error("Por favor, carga la hoja de vida del candidato en formato PDF teniendo en cuenta los requisitos de tipo y tamaño permitido.")
             logging.error("Document upload is missing.")
-            delete_docs(DOCS_FOLDER)
+            release_session_document(st.session_state)
             
-        else:
+        elif not job_id:
             st.info("Por favor, carga la hoja de vida del candidato y completa los requisitos del perfil para comenzar el análisis.")
             logging.info("Document and description inputs are missing.")
-            delete_docs(DOCS_FOLDER)
+            release_session_document(st.session_state)
+        
+        # Show the current analysis, including one started before a page refresh
+        if job_id:
+            show_analysis_job(job_id)
             
     except Exception as e:
         st.error(f"An error has occurred: {e}")
         logging.error(f"An error has occurred: {e}")
-        delete_docs(DOCS_FOLDER)
 
 # Entry point
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""
+Per-stage performance instrumentation: spans, counters and a Prometheus export.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Tuple
+
+from config import METRICS_ENABLED, METRICS_FILE, METRICS_PORT
+
+# Histogram bucket upper bounds in seconds
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_counters: Dict[LabelKey, float] = {}
+_histograms: Dict[LabelKey, dict] = {}
+_metrics_lock = threading.Lock()
+_metrics_server = None
+
+def _key(name: str, labels: dict) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def increment(name: str, value: float = 1, **labels):
+    """
+    Increase a counter.
+
+    Args:
+        name: Metric name
+        value: Amount to add
+        **labels: Metric labels
+    """
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name: str, value: float, **labels):
+    """
+    Record a duration in a histogram.
+
+    Args:
+        name: Metric name
+        value: Observed value in seconds
+        **labels: Metric labels
+    """
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _metrics_lock:
+        histogram = _histograms.setdefault(
+            key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+def log_event(event: str, **fields):
+    """
+    Emit a structured log record through the configured logging handlers.
+
+    The fields travel in "json_fields", which Google Cloud Logging stores as
+    the structured payload of the entry.
+
+    Args:
+        event: Event name
+        **fields: Structured fields of the record
+    """
+    if not METRICS_ENABLED:
+        return
+    payload = {"event": event, **fields}
+    logging.info(f"{event}: {fields}", extra={"json_fields": payload})
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[dict]:
+    """
+    Time a pipeline stage and record it as a metric and a structured log.
+
+    Attributes can be added to the yielded dictionary while the stage runs.
+
+    Args:
+        stage: Stage name
+        **attributes: Extra fields for the structured log record
+
+    Yields:
+        Mutable dictionary of attributes
+    """
+    start_time = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start_time
+        observe("stage_duration_seconds", duration, stage=stage, status=status)
+        log_event("span", stage=stage, status=status, duration_ms=round(duration * 1000, 2), **attributes)
+
+def render_prometheus() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+        Metrics text
+    """
+    def format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    lines = []
+    with _metrics_lock:
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"cv_analyzer_{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(_histograms.items()):
+            metric = f"cv_analyzer_{name}"
+            for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                lines.append(f"{metric}_bucket{format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {round(histogram['sum'], 6)}")
+            lines.append(f"{metric}_count{format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+def write_metrics_file(path: str = METRICS_FILE):
+    """Write the current metrics to a file scrapeable by the node exporter textfile collector"""
+    if not METRICS_ENABLED:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Error writing metrics file {path}: {e}")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serve /metrics over HTTP in a daemon thread, once per process; disabled when port is 0"""
+    global _metrics_server
+    if not METRICS_ENABLED or not port:
+        return
+    with _metrics_lock:
+        if _metrics_server is not None:
+            return
+        try:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError as e:
+            # Don't retry on every rerun, e.g. when another process owns the port
+            _metrics_server = False
+            logging.warning(f"Failed to start metrics server on port {port}: {e}")
+            return
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Serving metrics on port {port}")
@@ -0,0 +1,391 @@
+"""
+End-to-end CV analysis pipeline shared by the UI and other entry points.
+"""
+
+import re
+import time
+import queue
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import agents
+import tasks
+import metrics
+from config import (
+    OPENAI_MODEL_NAME,
+    LANGUAGE_DETECTION_ENABLED,
+    ANALYSIS_MODE,
+    DIRECT_ANALYSIS_MAX_CHARS,
+    PROMPT_REQUIREMENTS_MAX_TOKENS,
+    PROMPT_CV_MAX_TOKENS,
+    CRITERIA_PASS_RATIO,
+)
+from candidates import get_candidate_store, make_candidate_key
+from language import plan_translation
+from prompts import budget_inputs, count_tokens, fit_sections, render_prompt
+from scheduler import run_crew
+from result_cache import get_result_cache, make_result_key
+from streaming import emit_cached_result
+from vacancy import chunk_cv_sections, criterion_hash, parse_requirements
+from documents import get_document_store
+from extraction import extract_cv
+from utils import (
+    PdfSource,
+    compute_pdf_hash,
+    describe_pdf,
+    format_cv_sections,
+)
+
+VERDICT_PATTERN = re.compile(r"\b(no\s+cumple|cumple)\b", re.IGNORECASE)
+# "[3] No cumple: justificación", also accepting "3." or "3)" numbering
+CRITERION_VERDICT_PATTERN = re.compile(
+    r"^\W*(\d+)\W+(no\s+cumple|cumple)\b\W*(.*)$", re.IGNORECASE | re.MULTILINE
+)
+
+def get_prompt_version() -> str:
+    """Combined version of the agent and task prompts, including the analysis mode and token budgets"""
+    return (
+        f"agents-{agents.PROMPT_VERSION}.tasks-{tasks.PROMPT_VERSION}"
+        f".{ANALYSIS_MODE}-{DIRECT_ANALYSIS_MAX_CHARS}"
+        f".budget-{PROMPT_REQUIREMENTS_MAX_TOKENS}-{PROMPT_CV_MAX_TOKENS}"
+    )
+
+def analysis_prompt_parts(direct: bool) -> list:
+    """Templates that make up the analyst's prompt in the given mode"""
+    agent = agents.DIRECT_ANALYST_TEMPLATE if direct else agents.ANALYST_TEMPLATE
+    task = tasks.DIRECT_ANALYSIS_TASK_TEMPLATE if direct else tasks.ANALYSIS_TASK_TEMPLATE
+    return [agent["goal"], agent["backstory"], task["description"], task["expected_output"]]
+
+def select_analysis_mode(cv_text: str) -> str:
+    """
+    Choose between direct and retrieval analysis for a CV.
+
+    Args:
+        cv_text: Text extracted from the CV
+
+    Returns:
+        "direct" or "retrieval"
+    """
+    if ANALYSIS_MODE in ("direct", "retrieval"):
+        return ANALYSIS_MODE
+    # Scanned PDFs without a text layer still need the retrieval tool
+    if cv_text.strip() and len(cv_text) <= DIRECT_ANALYSIS_MAX_CHARS:
+        return "direct"
+    return "retrieval"
+
+def get_task_text(task) -> str:
+    """Extract the raw text produced by a crew task"""
+    output = task.output
+    return str(getattr(output, "raw_output", None) or output)
+
+def parse_verdict(evaluation: str) -> str:
+    """
+    Extract the final verdict from the evaluator's answer.
+
+    Args:
+        evaluation: Text produced by the evaluation task
+
+    Returns:
+        The first "Cumple" or "No cumple" found, or "Indeterminado"
+    """
+    match = VERDICT_PATTERN.search(evaluation)
+    if match is None:
+        return "Indeterminado"
+    return "Cumple" if match.group(1).casefold() == "cumple" else "No cumple"
+
+def parse_criteria_verdicts(text: str) -> Dict[int, dict]:
+    """
+    Extract the per-criterion verdicts from the criteria task output.
+
+    Args:
+        text: Text produced by the criteria task
+
+    Returns:
+        Mapping of criterion number to its verdict and justification
+    """
+    verdicts = {}
+    for match in CRITERION_VERDICT_PATTERN.finditer(text):
+        number, verdict, justification = match.groups()
+        verdicts.setdefault(int(number), {
+            "verdict": "Cumple" if verdict.casefold() == "cumple" else "No cumple",
+            "justification": justification.strip(),
+        })
+    return verdicts
+
+def merge_criteria_verdicts(items: List[dict]) -> tuple:
+    """
+    Compute the final verdict from the per-criterion verdicts.
+
+    Criteria without a verdict count as not met.
+
+    Args:
+        items: Per-criterion results with "criterion" and "verdict"
+
+    Returns:
+        Tuple of the final verdict and the evaluation text
+    """
+    met = [item for item in items if item["verdict"] == "Cumple"]
+    unmet = [item["criterion"] for item in items if item["verdict"] != "Cumple"]
+    ratio = len(met) / len(items)
+    verdict = "Cumple" if ratio >= CRITERIA_PASS_RATIO else "No cumple"
+    evaluation = f"{verdict}. El candidato cumple {len(met)} de {len(items)} requisitos ({ratio:.0%})."
+    if unmet:
+        evaluation += " No cumple o no se pudo verificar: " + "; ".join(unmet) + "."
+    return verdict, evaluation
+
+def format_criteria_analysis(items: List[dict]) -> str:
+    """Render the per-criterion verdicts as the analysis text"""
+    return "\n".join(
+        f"- **{item['criterion']}**: {item['verdict']}. {item['justification']}".rstrip()
+        for item in items
+    )
+
+def analyze_cv_incremental(cv: PdfSource, descripcion: str, use_cache: bool = True,
+                           event_queue: Optional[queue.Queue] = None) -> Optional[dict]:
+    """
+    Analyze a CV requirement by requirement, reusing stored verdicts.
+
+    The CV text and the verdict of every criterion are kept in the candidate
+    store, so after an edit of the requirements only the new or changed
+    criteria are judged by the LLM, and the final verdict is recomputed from
+    all of them.
+
+    Args:
+        cv: Path to the CV PDF file, or its bytes for in-memory uploads
+        descripcion: Requirements text for the vacancy
+        use_cache: Whether to reuse the stored text and verdicts; when False
+            the CV is re-extracted and every criterion judged again, and the
+            new text and verdicts replace the stored ones
+        event_queue: Optional queue that receives streaming progress events
+
+    Returns:
+        Result dictionary like analyze_cv's plus the per-criterion verdicts,
+        or None when there are no criteria or the CV has no text layer to
+        judge them on
+    """
+    start_time = time.time()
+    criteria = parse_requirements(descripcion)
+    if not criteria:
+        return None
+    store = get_candidate_store()
+    cv_hash = compute_pdf_hash(cv)
+    candidate_key = make_candidate_key(cv_hash)
+    candidate = store.get_candidate(candidate_key) if use_cache else None
+    if candidate is None:
+        with metrics.span("text_extraction") as attributes:
+            extracted = extract_cv(cv)
+            cv_text = extracted["text"]
+            attributes["chars"] = len(cv_text)
+        if not cv_text.strip():
+            return None
+        sections = extracted["sections"]
+        candidate = {"text": cv_text, "sections": sections, "chunks": chunk_cv_sections(sections)}
+        store.save_candidate(candidate_key, candidate["text"], candidate["sections"], candidate["chunks"])
+
+    hashes = [criterion_hash(criterion) for criterion in criteria]
+    prompt_version = get_prompt_version()
+    verdicts = store.get_verdicts(candidate_key, hashes, OPENAI_MODEL_NAME, prompt_version) if use_cache else {}
+    pending = [(criterion, hash_) for criterion, hash_ in zip(criteria, hashes) if hash_ not in verdicts]
+    metrics.increment("criteria_verdicts_total", len(criteria) - len(pending), outcome="reused")
+    metrics.increment("criteria_verdicts_total", len(pending), outcome="evaluated")
+    logging.info(f"Incremental analysis: {len(criteria) - len(pending)} criteria reused, {len(pending)} to evaluate")
+
+    usage = {}
+    cv_truncated = False
+    if pending:
+        sections, cv_truncated = fit_sections(candidate["sections"], PROMPT_CV_MAX_TOKENS)
+        inputs = {
+            "hoja_de_vida": format_cv_sections(sections),
+            "criterios": "\n".join(f"[{number}] {criterion}" for number, (criterion, _) in enumerate(pending, start=1)),
+        }
+        with metrics.span("create_crew", analysis_mode="incremental"):
+            crew, criteria_task = agents.create_criteria_crew(event_queue, usage)
+        with metrics.span("crew_kickoff", analysis_mode="incremental", criteria=len(pending)):
+            run_crew(crew, inputs)
+        parsed = parse_criteria_verdicts(get_task_text(criteria_task))
+        # Criteria the model skipped are not stored, so the next run retries them
+        new_verdicts = {
+            hash_: {"criterion": criterion, **parsed[number]}
+            for number, (criterion, hash_) in enumerate(pending, start=1)
+            if number in parsed
+        }
+        store.save_verdicts(candidate_key, OPENAI_MODEL_NAME, prompt_version, new_verdicts)
+        verdicts.update(new_verdicts)
+        metrics.write_metrics_file()
+
+    pending_hashes = {hash_ for _, hash_ in pending}
+    items = []
+    for criterion, hash_ in zip(criteria, hashes):
+        stored = verdicts.get(hash_, {"verdict": "Indeterminado", "justification": ""})
+        items.append({
+            "criterion": criterion,
+            "verdict": stored["verdict"],
+            "justification": stored["justification"],
+            "reused": hash_ not in pending_hashes,
+        })
+    verdict, evaluation = merge_criteria_verdicts(items)
+    end_time = time.time()
+    result = {
+        "cv_hash": cv_hash,
+        "model": OPENAI_MODEL_NAME,
+        "analysis": format_criteria_analysis(items),
+        "evaluation": evaluation,
+        "verdict": verdict,
+        "criteria": items,
+        "evaluated_criteria": len(pending),
+        "reused_criteria": len(criteria) - len(pending),
+        "language": None,
+        "analysis_mode": "incremental",
+        "tokens": {"cv_truncated": cv_truncated, "llm": usage},
+        "processing_time": round(end_time - start_time, 2),
+        "created": end_time,
+        # Nothing was sent to the LLM when every verdict was already stored
+        "cached": not pending,
+        "lookup_time": round(end_time - start_time, 4),
+    }
+    emit_cached_result(event_queue, result)
+    logging.info(f"Analyzed {describe_pdf(cv)} incrementally in {result['processing_time']} seconds")
+    return result
+
+@contextmanager
+def pdf_path_for(cv: PdfSource, needed: bool) -> Iterator[Optional[str]]:
+    """
+    Provide a file path for a CV only when a tool needs one.
+
+    In-memory uploads are spilled through the document store, which shares
+    the file between concurrent analyses and removes it once released.
+
+    Args:
+        cv: Path to the CV PDF file or its bytes
+        needed: Whether the caller needs a path at all
+
+    Yields:
+        Path to the PDF, or None when not needed
+    """
+    if not needed:
+        yield None
+    elif isinstance(cv, bytes):
+        with get_document_store().path(cv) as cv_path:
+            yield cv_path
+    else:
+        yield cv
+
+def analyze_cv(cv: PdfSource, descripcion: str, use_cache: bool = True,
+               event_queue: Optional[queue.Queue] = None) -> dict:
+    """
+    Analyze a CV against the profile requirements, reusing cached results.
+
+    Args:
+        cv: Path to the CV PDF file, or its bytes for in-memory uploads
+        descripcion: Requirements text for the vacancy
+        use_cache: Whether to look up and store the result in the result cache,
+            or in incremental mode whether to reuse the stored verdicts
+        event_queue: Optional queue that receives streaming progress events
+
+    Returns:
+        Dictionary with the analysis, the final evaluation and its verdict, the
+        processing time in seconds, the language detection decision, the
+        analysis mode used, the prompt token counts before and after
+        budgeting with the tokens used by the LLM calls, and whether the
+        result came from the cache
+    """
+    try:
+        # Incremental analyses keep their own per-criterion store instead of
+        # the result cache; requirements without criteria and CVs without a
+        # text layer fall back to the crew analysis
+        if ANALYSIS_MODE == "incremental":
+            result = analyze_cv_incremental(cv, descripcion, use_cache, event_queue)
+            if result is not None:
+                return result
+            logging.info(f"No criteria or no text layer for {describe_pdf(cv)}, using the crew analysis")
+
+        start_time = time.time()
+        cache = get_result_cache()
+        cv_hash = compute_pdf_hash(cv)
+        key = make_result_key(cv_hash, descripcion, OPENAI_MODEL_NAME, get_prompt_version())
+
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                cached["cached"] = True
+                cached["lookup_time"] = round(time.time() - start_time, 4)
+                logging.info(f"Result cache hit for {describe_pdf(cv)}")
+                metrics.increment("result_cache_total", outcome="hit")
+                emit_cached_result(event_queue, cached)
+                return cached
+
+        metrics.increment("result_cache_total", outcome="miss")
+
+        with metrics.span("text_extraction") as attributes:
+            extracted = extract_cv(cv)
+            cv_text = extracted["text"]
+            attributes["chars"] = len(cv_text)
+            attributes["pages"] = extracted["page_count"]
+        analysis_mode = select_analysis_mode(cv_text)
+        direct = analysis_mode == "direct"
+
+        # Fit the requirements and the injected CV text into their token budgets
+        with metrics.span("prompt_budget") as attributes:
+            sections = extracted["sections"] if direct else None
+            fitted_descripcion, fitted_sections, tokens = budget_inputs(descripcion, sections)
+            raw_inputs = {'descripcion': descripcion}
+            inputs = {'descripcion': fitted_descripcion}
+            if direct:
+                raw_inputs['hoja_de_vida'] = format_cv_sections(sections)
+                inputs['hoja_de_vida'] = format_cv_sections(fitted_sections)
+            parts = analysis_prompt_parts(direct)
+            tokens["analysis_prompt_before"] = count_tokens(render_prompt(parts, raw_inputs))
+            tokens["analysis_prompt_after"] = count_tokens(render_prompt(parts, inputs))
+            attributes.update(tokens)
+
+        # Skip the translator when both inputs are already in Spanish, and in
+        # direct mode, where the analyst cannot delegate to it and it would
+        # only translate the Spanish analysis
+        if direct:
+            language = {"use_translator": False}
+        elif LANGUAGE_DETECTION_ENABLED:
+            language = plan_translation(cv_text, descripcion)
+        else:
+            language = {"use_translator": True}
+
+        # Create and run the crew; only retrieval mode needs the PDF on disk
+        usage = {}
+        with pdf_path_for(cv, needed=not direct) as cv_path:
+            with metrics.span("create_crew", analysis_mode=analysis_mode):
+                crew, analysis_task, evaluation_task = agents.create_crew(
+                    cv_path,
+                    include_translator=language["use_translator"],
+                    direct=direct,
+                    event_queue=event_queue,
+                    usage=usage,
+                )
+            kickoff_start = time.time()
+            with metrics.span("crew_kickoff", analysis_mode=analysis_mode):
+                run_crew(crew, inputs)
+            end_time = time.time()
+        metrics.write_metrics_file()
+
+        evaluation = get_task_text(evaluation_task)
+        result = {
+            "cv_hash": cv_hash,
+            "model": OPENAI_MODEL_NAME,
+            "analysis": get_task_text(analysis_task),
+            "evaluation": evaluation,
+            "verdict": parse_verdict(evaluation),
+            "language": language,
+            "analysis_mode": analysis_mode,
+            "tokens": {**tokens, "llm": usage},
+            "processing_time": round(end_time - kickoff_start, 2),
+            "created": end_time,
+        }
+        if use_cache:
+            cache.set(key, result)
+
+        result["cached"] = False
+        logging.info(f"Analyzed {describe_pdf(cv)} in {result['processing_time']} seconds")
+        return result
+
+    except Exception as e:
+        logging.error(f"Error analyzing CV {describe_pdf(cv)}: {e}")
+        raise
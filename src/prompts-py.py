@@ -0,0 +1,176 @@
+"""
+Token counting and budgeting for the prompts sent to the agents.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    OPENAI_MODEL_NAME,
+    PROMPT_TOKEN_BUDGET,
+    PROMPT_REQUIREMENTS_MAX_TOKENS,
+    PROMPT_CV_MAX_TOKENS,
+)
+
+# Appended where text was cut to fit the budget
+TRUNCATION_MARKER = "[...]"
+
+# A partial last line is dropped when cutting only if it is shorter than this
+# fraction of the kept text, so one long paragraph is not cut down to its title
+MAX_DROPPED_LINE_RATIO = 0.25
+
+# Rough size of a token when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=8)
+def _get_encoding(model_name: str):
+    """Tokenizer for a model, or None when tiktoken or its encoding files are not available"""
+    try:
+        import tiktoken
+    except ImportError:
+        logging.warning("tiktoken is not installed; estimating tokens from characters")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline; the
+        # None result is cached so the download is not retried on every call
+        logging.warning(f"Could not load the tokenizer for {model_name}; estimating tokens from characters: {e}")
+        return None
+
+def count_tokens(text: str, model_name: str = OPENAI_MODEL_NAME) -> int:
+    """
+    Count the tokens of a text for a model.
+
+    Args:
+        text: Text to count
+        model_name: Model whose tokenizer is used
+
+    Returns:
+        Number of tokens, estimated from the length if tiktoken is missing
+    """
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str = OPENAI_MODEL_NAME) -> str:
+    """
+    Cut a text to a token budget, preferring to end on a whole line.
+
+    The partial last line is only dropped when it is short compared to the
+    kept text; otherwise the text is cut mid-line.
+
+    Args:
+        text: Text to cut
+        max_tokens: Maximum number of tokens to keep
+        model_name: Model whose tokenizer is used
+
+    Returns:
+        The text unchanged if it fits, otherwise its head followed by a marker
+    """
+    if count_tokens(text, model_name) <= max_tokens:
+        return text
+    # Leave room for the marker and its line break
+    max_tokens = max(max_tokens - count_tokens(TRUNCATION_MARKER, model_name) - 1, 1)
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        head = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    # Drop the partial last line when little is lost by doing so
+    if "\n" in head and len(head) - head.rindex("\n") <= len(head) * MAX_DROPPED_LINE_RATIO:
+        head = head[:head.rindex("\n")]
+    return f"{head.rstrip()}\n{TRUNCATION_MARKER}"
+
+def fit_sections(sections: Dict[str, str], max_tokens: int,
+                 model_name: str = OPENAI_MODEL_NAME) -> Tuple[Dict[str, str], bool]:
+    """
+    Fit CV sections into a token budget, keeping the start of every section.
+
+    Sections that fit within an even share of the budget are kept whole, and
+    the rest of the budget is split among the longer sections, so experience,
+    education and skills all stay represented instead of losing the last ones.
+
+    Args:
+        sections: Ordered mapping of section name to text
+        max_tokens: Token budget for all sections
+        model_name: Model whose tokenizer is used
+
+    Returns:
+        The fitted sections and whether any of them was truncated
+    """
+    sizes = {name: count_tokens(body, model_name) for name, body in sections.items()}
+    if sum(sizes.values()) <= max_tokens:
+        return sections, False
+
+    remaining = max_tokens
+    long_sections = dict(sizes)
+    # Hand out the budget to the short sections first, then split what is left
+    while long_sections:
+        share = remaining // len(long_sections)
+        short = {name: size for name, size in long_sections.items() if size <= share}
+        if not short:
+            break
+        for name, size in short.items():
+            remaining -= size
+            del long_sections[name]
+
+    fitted = {}
+    for name, body in sections.items():
+        if name in long_sections:
+            fitted[name] = truncate_to_tokens(body, max(remaining // len(long_sections), 1), model_name)
+        else:
+            fitted[name] = body
+    return fitted, True
+
+def render_prompt(parts: List[str], inputs: Dict[str, str]) -> str:
+    """Render prompt templates with crew inputs the way CrewAI interpolates them"""
+    return "\n\n".join(part.format(**inputs) for part in parts)
+
+def check_budget(prompt_tokens: int, budget: int = PROMPT_TOKEN_BUDGET, label: Optional[str] = None) -> bool:
+    """
+    Check a prompt against the token budget, logging a warning when it is exceeded.
+
+    Args:
+        prompt_tokens: Tokens of the prompt
+        budget: Token budget per call
+        label: Name of the call, for the log message
+
+    Returns:
+        Whether the prompt fits the budget
+    """
+    if prompt_tokens <= budget:
+        return True
+    logging.warning(f"Prompt for {label or 'LLM call'} has {prompt_tokens} tokens, over the {budget} token budget")
+    return False
+
+def budget_inputs(descripcion: str, cv_sections: Optional[Dict[str, str]] = None,
+                  model_name: str = OPENAI_MODEL_NAME) -> Tuple[str, Optional[Dict[str, str]], dict]:
+    """
+    Fit the requirements and the CV text into their token budgets.
+
+    Args:
+        descripcion: Requirements text for the vacancy
+        cv_sections: CV sections injected in direct mode, if any
+        model_name: Model whose tokenizer is used
+
+    Returns:
+        The fitted requirements, the fitted sections and the token counts
+        before and after fitting
+    """
+    stats = {"requirements_before": count_tokens(descripcion, model_name)}
+    fitted_descripcion = truncate_to_tokens(descripcion, PROMPT_REQUIREMENTS_MAX_TOKENS, model_name)
+    stats["requirements_after"] = count_tokens(fitted_descripcion, model_name)
+    stats["requirements_truncated"] = fitted_descripcion != descripcion
+
+    fitted_sections = None
+    if cv_sections is not None:
+        stats["cv_before"] = sum(count_tokens(body, model_name) for body in cv_sections.values())
+        fitted_sections, stats["cv_truncated"] = fit_sections(cv_sections, PROMPT_CV_MAX_TOKENS, model_name)
+        stats["cv_after"] = sum(count_tokens(body, model_name) for body in fitted_sections.values())
+    return fitted_descripcion, fitted_sections, stats
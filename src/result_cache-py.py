@@ -0,0 +1,199 @@
+"""
+Result cache for CV analyses keyed by CV content, requirements, model and prompt version.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from config import (
+    RESULT_CACHE_BACKEND,
+    RESULT_CACHE_PATH,
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_MAX_ENTRIES,
+)
+
+def normalize_descripcion(descripcion: str) -> str:
+    """
+    Normalize the requirements text so cosmetic edits share a cache entry.
+
+    Args:
+        descripcion: Raw requirements text from the UI
+
+    Returns:
+        Case-folded text with collapsed whitespace
+    """
+    return " ".join(descripcion.split()).casefold()
+
+def make_result_key(cv_hash: str, descripcion: str, model_name: str, prompt_version: str) -> str:
+    """
+    Build the cache key for an analysis.
+
+    Args:
+        cv_hash: SHA-256 digest of the CV PDF content
+        descripcion: Requirements text
+        model_name: LLM model used for the analysis
+        prompt_version: Version of the agent and task prompts
+
+    Returns:
+        Hex-encoded cache key
+    """
+    payload = json.dumps(
+        [cv_hash, normalize_descripcion(descripcion), model_name, prompt_version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Interface for result cache backends"""
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class NullResultCache(ResultCache):
+    """Backend that never stores anything"""
+
+    def get(self, key: str) -> Optional[dict]:
+        return None
+
+    def set(self, key: str, value: dict):
+        pass
+
+    def clear(self):
+        pass
+
+class MemoryResultCache(ResultCache):
+    """In-process LRU backend with TTL"""
+
+    def __init__(self, ttl: int = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(value)
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = (time.time(), dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteResultCache(ResultCache):
+    """Local SQLite backend with TTL and LRU eviction"""
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, ttl: int = RESULT_CACHE_TTL,
+                 max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+            conn.execute(
+                """DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+_BACKENDS: Dict[str, Callable[[], ResultCache]] = {
+    "none": NullResultCache,
+    "memory": MemoryResultCache,
+    "sqlite": SQLiteResultCache,
+}
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def register_backend(name: str, factory: Callable[[], ResultCache]):
+    """
+    Register a result cache backend selectable through RESULT_CACHE_BACKEND.
+
+    Args:
+        name: Backend name
+        factory: Callable returning a ResultCache instance
+    """
+    _BACKENDS[name] = factory
+
+def get_result_cache() -> ResultCache:
+    """
+    Get the process-wide result cache, creating it on first use.
+
+    Returns:
+        The configured ResultCache backend
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            try:
+                _result_cache = _BACKENDS[RESULT_CACHE_BACKEND]()
+                logging.info(f"Using '{RESULT_CACHE_BACKEND}' result cache backend")
+            except Exception as e:
+                logging.error(f"Error creating '{RESULT_CACHE_BACKEND}' result cache, caching disabled: {e}")
+                _result_cache = NullResultCache()
+        return _result_cache
@@ -0,0 +1,106 @@
+"""
+Dependency-aware scheduling of crew tasks.
+
+The task graph is derived from each task's context, and tasks that the next
+task does not depend on are run with CrewAI's asynchronous execution, so
+independent branches overlap instead of running one after another.
+"""
+
+import logging
+from typing import Any, Dict, List, Set
+
+def build_task_graph(tasks: List[Any]) -> Dict[int, Set[int]]:
+    """
+    Derive the dependencies between crew tasks.
+
+    A task depends on the tasks in its context. A task without context
+    receives the previous task's output in a sequential crew, so it depends
+    on the previous task.
+
+    Args:
+        tasks: Crew tasks in execution order
+
+    Returns:
+        Mapping of each task index to the indices of the tasks it depends on
+    """
+    positions = {id(task): i for i, task in enumerate(tasks)}
+    graph = {}
+    for i, task in enumerate(tasks):
+        if task.context:
+            graph[i] = {positions[id(dependency)] for dependency in task.context if id(dependency) in positions}
+        else:
+            graph[i] = {i - 1} if i > 0 else set()
+    return graph
+
+def plan_concurrent_tasks(tasks: List[Any], graph: Dict[int, Set[int]]) -> List[bool]:
+    """
+    Decide which tasks can run concurrently with the tasks that follow them.
+
+    A task may run in the background when the next task does not depend on
+    it in the task graph, since that task is the next point where the crew
+    runs synchronously; a task depending on it right away would only wait for
+    it. Neither the task nor any later task may delegate or share its agent,
+    since an agent's executor cannot run two tasks at once.
+    Later tasks depending on it wait for it before starting, which keeps
+    outputs identical to a sequential run.
+
+    Args:
+        tasks: Crew tasks in execution order
+        graph: Dependencies of each task, from build_task_graph
+
+    Returns:
+        Whether each task should run asynchronously
+    """
+    plan = []
+    for i, task in enumerate(tasks):
+        later = tasks[i + 1:]
+        plan.append(
+            bool(later)
+            and i not in graph[i + 1]
+            and not task.agent.allow_delegation
+            and all(other.agent is not task.agent and not other.agent.allow_delegation for other in later)
+        )
+    return plan
+
+def schedule_concurrent_tasks(tasks: List[Any]) -> int:
+    """
+    Mark the tasks that can overlap with later tasks for asynchronous execution.
+
+    Args:
+        tasks: Crew tasks in execution order
+
+    Returns:
+        Number of tasks scheduled asynchronously
+    """
+    graph = build_task_graph(tasks)
+    plan = plan_concurrent_tasks(tasks, graph)
+    for task, concurrent in zip(tasks, plan):
+        task.async_execution = concurrent
+    logging.info(f"Task graph {graph}: {sum(plan)} of {len(tasks)} tasks run concurrently")
+    return sum(plan)
+
+def run_crew(crew: Any, inputs: dict) -> str:
+    """
+    Run a crew and wait for its background tasks.
+
+    A sequential crew returns once its last task finishes, which can be
+    before a concurrent branch does; this waits for every task so their
+    outputs and callbacks are complete when the caller reads them.
+
+    Args:
+        crew: Crew to run
+        inputs: Inputs interpolated into the agents and tasks
+
+    Returns:
+        Output of the crew
+
+    Raises:
+        RuntimeError: If a background task ended without output
+    """
+    output = crew.kickoff(inputs=inputs)
+    for task in crew.tasks:
+        if task.async_execution and task.thread is not None:
+            task.thread.join()
+            if task.output is None:
+                raise RuntimeError(f"Task for agent {task.agent.role} finished without output")
+    return output
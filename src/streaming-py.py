@@ -0,0 +1,67 @@
+"""
+Bridge that streams crew progress and LLM tokens to the UI through a queue.
+"""
+
+import queue
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Event types put on the queue
+TOKEN = "token"
+STEP = "step"
+TASK_DONE = "task_done"
+DONE = "done"
+ERROR = "error"
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that forwards each generated token to a queue"""
+
+    def __init__(self, event_queue: queue.Queue, agent_role: str):
+        self.event_queue = event_queue
+        self.agent_role = agent_role
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.event_queue.put({"type": TOKEN, "agent": self.agent_role, "text": token})
+
+def _step_actions(step: Any) -> List[Any]:
+    """Agent actions or finishes contained in a crew step callback payload"""
+    items = step if isinstance(step, list) else [step]
+    return [item[0] if isinstance(item, tuple) else item for item in items]
+
+def step_tools(step: Any) -> List[str]:
+    """Names of the tools invoked in an agent step"""
+    return [action.tool for action in _step_actions(step) if getattr(action, "tool", None)]
+
+def describe_step(step: Any) -> str:
+    """Summarize an agent step (tool call or final answer) for display"""
+    parts = []
+    for action in _step_actions(step):
+        tool = getattr(action, "tool", None)
+        if tool:
+            parts.append(f"Usando herramienta: {tool}")
+        elif hasattr(action, "return_values"):
+            parts.append("Respuesta lista")
+    return "; ".join(parts)
+
+def make_step_callback(event_queue: queue.Queue) -> Callable[[Any], None]:
+    """Crew step callback that reports agent progress on the queue"""
+    def callback(step: Any):
+        description = describe_step(step)
+        if description:
+            event_queue.put({"type": STEP, "text": description})
+    return callback
+
+def make_task_callback(event_queue: queue.Queue, task_name: str) -> Callable[[Any], None]:
+    """Task callback that publishes the task output as soon as it finishes"""
+    def callback(output: Any):
+        text = str(getattr(output, "raw_output", None) or output)
+        event_queue.put({"type": TASK_DONE, "task": task_name, "text": text})
+    return callback
+
+def emit_cached_result(event_queue: Optional[queue.Queue], result: Dict[str, Any]):
+    """Publish a cached result as task events so consumers handle both paths alike"""
+    if event_queue is None:
+        return
+    event_queue.put({"type": TASK_DONE, "task": "analysis", "text": result["analysis"]})
+    event_queue.put({"type": TASK_DONE, "task": "evaluation", "text": result["evaluation"]})
@@ -5,54 +5,133 @@ CrewAI tasks for CV analysis.
 import logging
 from crewai import Task
 
-def create_analysis_task(analyst, pdf_tool):
+# Bump whenever the prompts below change so cached results are invalidated
+PROMPT_VERSION = "2"
+
+# Instructions shared by the tasks; each appears once per prompt, and the
+# requirements are only part of the analysis task
+SPANISH_ONLY = "Responde solamente en español."
+TRANSLATION_DELEGATION = (
+    "Si la hoja de vida o los requisitos están en un idioma diferente al español, "
+    "delega al agente traductor para traducirlos antes de analizarlos."
+)
+ANALYSIS_EXPECTED_OUTPUT = (
+    "Un análisis detallado indicando, para cada requisito, si el candidato cumple o no "
+    "con el criterio, con una breve justificación de cada caso, que resalte claramente "
+    "las áreas en las que cumple y en las que no cumple."
+)
+
+ANALYSIS_TASK_TEMPLATE = dict(
+    description=(
+        """Requisitos del perfil:\n{descripcion}\n\nEvalúa si el candidato cumple con los requisitos mínimos del perfil. Compara cada requisito con la experiencia, habilidades y formación de su hoja de vida, consultándola con la tool de búsqueda de texto. """
+        + SPANISH_ONLY),
+    expected_output=ANALYSIS_EXPECTED_OUTPUT,
+)
+
+DIRECT_ANALYSIS_TASK_TEMPLATE = dict(
+    description=(
+        """Requisitos del perfil:\n{descripcion}\n\nHoja de vida del candidato, organizada por secciones:\n\n{hoja_de_vida}\n\nEvalúa si el candidato cumple con los requisitos mínimos del perfil. Compara cada requisito con la experiencia, habilidades y formación de la hoja de vida y responde directamente, sin usar herramientas. """
+        + SPANISH_ONLY),
+    expected_output=ANALYSIS_EXPECTED_OUTPUT,
+)
+
+TRANSLATOR_TASK_TEMPLATE = dict(
+    description="""Traduce el contenido proporcionado al idioma español. Si el texto ya está en español, devuélvelo sin cambios.""",
+    expected_output="""El texto traducido al español manteniendo el significado del contenido original.""",
+)
+
+EVALUATION_TASK_TEMPLATE = dict(
+    description=(
+        """Usando únicamente el análisis obtenido en la tarea anterior, determina si el candidato cumple en términos generales con los requisitos mínimos del puesto. No repitas el análisis de cada criterio. """
+        + SPANISH_ONLY),
+    expected_output="""La palabra "Cumple" o "No cumple" seguida de una justificación clara y concisa de la decisión.""",
+)
+
+CRITERIA_TASK_TEMPLATE = dict(
+    description=(
+        """Hoja de vida del candidato, organizada por secciones:\n\n{hoja_de_vida}\n\nCriterios a evaluar:\n{criterios}\n\nPara cada criterio numerado, indica si la hoja de vida demuestra que el candidato lo cumple y responde directamente, sin usar herramientas. """
+        + SPANISH_ONLY),
+    expected_output="""Una línea por criterio, en el mismo orden, con el formato "[número] Cumple: justificación" o "[número] No cumple: justificación", sin texto adicional.""",
+)
+
+def create_analysis_task(analyst, pdf_tool, allow_delegation: bool = True):
     """
     Create the CV analysis task.
-    
+
     Args:
         analyst: The analyst agent
         pdf_tool: The PDF tool for document analysis
-        
+        allow_delegation: Whether to instruct the analyst to delegate translations
+
     Returns:
         The analysis task
     """
     try:
-        analysis_task = Task(
-            description=(
-                """Evaluar si el perfil del candidato cumple con los requisitos mínimos detallados en la descripción del trabajo {descripcion}, basándose en la información proporcionada en su hoja de vida. Realizar un análisis exhaustivo de cada criterio especificado en la descripción y compararlo con la experiencia, habilidades y formación presentes en el CV. Debes usar la tool de búsqueda de texto para analizar el contenido de la hoja de vida y proporcionar el análisis solamente en español. Si el contenido de la hoja de vida o los requisitos del perfil están en otro idioma diferente al español, delega al agente traductor para traducirlos antes de proceder con el análisis."""),
-            expected_output=(
-                """Un análisis detallado solamente en español indicando, para cada requisito, si el candidato cumple o no con el criterio específico, junto con una breve justificación de cada caso. El resultado debe resaltar claramente las áreas en las que el candidato cumple los requisitos, así como las áreas donde no los cumple, en base a la comparación de los requisitos del perfil: {descripcion} y la hoja de vida. Debes usar la tool de búsqueda de texto para analizar el contenido de la hoja de vida. Si el contenido de la hoja de vida o los requisitos del perfil están en otro idioma diferente al español, delega al agente traductor para traducirlos antes de proceder con el análisis."""),
-            agent=analyst,
-            tools=[pdf_tool],
-        )
+        template = dict(ANALYSIS_TASK_TEMPLATE)
+        if allow_delegation:
+            template["description"] += " " + TRANSLATION_DELEGATION
+        analysis_task = Task(**template, agent=analyst, tools=[pdf_tool])
         logging.info("Created analysis task")
         return analysis_task
     except Exception as e:
         logging.error(f"Error creating analysis task: {e}")
         raise
 
+def create_direct_analysis_task(analyst):
+    """
+    Create the CV analysis task with the CV text injected in the prompt.
+
+    The text is provided through the "hoja_de_vida" crew input, so the analyst
+    answers in a single call without searching the PDF.
+
+    Args:
+        analyst: The analyst agent
+
+    Returns:
+        The analysis task
+    """
+    try:
+        analysis_task = Task(**DIRECT_ANALYSIS_TASK_TEMPLATE, agent=analyst)
+        logging.info("Created direct analysis task")
+        return analysis_task
+    except Exception as e:
+        logging.error(f"Error creating direct analysis task: {e}")
+        raise
+
+def create_criteria_task(analyst):
+    """
+    Create the task that judges numbered requirement criteria one by one.
+
+    The CV text and the criteria are provided through the "hoja_de_vida" and
+    "criterios" crew inputs.
+
+    Args:
+        analyst: The analyst agent
+
+    Returns:
+        The criteria task
+    """
+    try:
+        criteria_task = Task(**CRITERIA_TASK_TEMPLATE, agent=analyst)
+        logging.info("Created criteria task")
+        return criteria_task
+    except Exception as e:
+        logging.error(f"Error creating criteria task: {e}")
+        raise
+
 def create_translator_task(translator, analysis_task):
     """
     Create the translator task.
-    
+
     Args:
         translator: The translator agent
         analysis_task: The analysis task for context
-        
+
     Returns:
         The translator task
     """
     try:
-        translator_task = Task(
-            description=(
-                """Traduce el contenido proporcionado al idioma español. Si el texto ya está en español, devuelve el mismo texto sin cambios."""
-            ),
-            expected_output=(
-                """El texto traducido al español manteniendo el significado del contenido original. Si el texto ya está en español, devuelve el mismo texto."""
-            ),
-            agent=translator,
-            context=[analysis_task]
-        )
+        translator_task = Task(**TRANSLATOR_TASK_TEMPLATE, agent=translator, context=[analysis_task])
         logging.info("Created translator task")
         return translator_task
     except Exception as e:
@@ -62,23 +141,16 @@ def create_translator_task(translator, analysis_task):
 def create_evaluation_task(evaluator, analysis_task):
     """
     Create the evaluation task.
-    
+
     Args:
         evaluator: The evaluator agent
         analysis_task: The analysis task for context
-        
+
     Returns:
         The evaluation task
     """
     try:
-        evaluation_task = Task(
-            description=(
-                """Determinar si el candidato cumple en términos generales con los requisitos mínimos establecidos en la descripción del puesto en relación con su joha de vida, utilizando únicamente el análisis ya obtenido en la tarea de "analysis task". No es necesario realizar un análisis detallado de cada criterio; solo verifica si el perfil del candidato se ajusta de manera general a los requisitos del puesto. La respuesta debe ser "Cumple" o "No cumple" seguido de una justificación clara y concisa de tu decisión en español."""),
-            expected_output=(
-                """Una evaluación en español indicando únicamente si el candidato cumple o no con los requisitos mínimos del puesto en relación con su hoja de vida, basado en el análisis ya obtenido. La respuesta debe ser "Cumple" o "No cumple" seguido de una justificación clara y concisa de tu decisión. No es necesario realizar un análisis detallado de cada criterio; solo verifica si el perfil del candidato se ajusta de manera general a los requisitos del puesto."""),
-            agent=evaluator,
-            context=[analysis_task]
-        )
+        evaluation_task = Task(**EVALUATION_TASK_TEMPLATE, agent=evaluator, context=[analysis_task])
         logging.info("Created evaluation task")
         return evaluation_task
     except Exception as e:
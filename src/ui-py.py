@@ -2,18 +2,26 @@
 UI components for the CV Analyzer Streamlit application.
 """
 
+import time
+import queue
 import base64
 import streamlit as st
 import logging
+from functools import lru_cache
 
 from config import LOGO_PATH
 
+@lru_cache(maxsize=1)
+def load_logo_base64() -> str:
+    """Read and encode the logo once per process"""
+    with open(LOGO_PATH, "rb") as file:
+        return base64.b64encode(file.read()).decode()
+
 def setup_ui():
     """Configure the Streamlit UI components"""
     try:
         # Load and encode logo
-        with open(LOGO_PATH, "rb") as file:
-            logo_base64 = base64.b64encode(file.read()).decode()
+        logo_base64 = load_logo_base64()
         
         # Set up page title and logo
         st.title('Análisis y Validación de Hojas de Vida para Selección de Candidatos')
@@ -50,3 +58,60 @@ def setup_ui():
     except Exception as e:
         logging.error(f"Error setting up UI: {e}")
         st.error("Error loading application interface. Please try again later.")
+
+def render_streaming_analysis(event_queue: queue.Queue, refresh_interval: float = 0.2) -> dict:
+    """
+    Render analysis progress incrementally from a streaming event queue.
+    
+    Tokens are appended to the analysis or verdict area of the agent that
+    produces them, and each area is replaced by the final task output as soon
+    as that task finishes.
+    
+    Args:
+        event_queue: Queue-like reader of an analysis job's events
+        refresh_interval: Minimum seconds between redraws of streamed text
+        
+    Returns:
+        The final analysis result
+    """
+    status = st.empty()
+    analysis_area = st.empty()
+    verdict_area = st.empty()
+    buffers = {"analysis": "", "evaluation": ""}
+    finished = set()
+    last_draw = 0.0
+    status.info("Procesando Hoja de Vida... Espera un momento por favor.")
+    
+    while True:
+        try:
+            event = event_queue.get(timeout=refresh_interval)
+        except queue.Empty:
+            event = None
+        
+        if event is not None:
+            if event["type"] == "token":
+                target = "evaluation" if event["agent"] == "Evaluador de selección" else "analysis"
+                if target not in finished:
+                    buffers[target] += event["text"]
+            elif event["type"] == "step":
+                status.info(f"Procesando Hoja de Vida... {event['text']}")
+            elif event["type"] == "task_done" and event["task"] in buffers:
+                finished.add(event["task"])
+                if event["task"] == "analysis":
+                    analysis_area.success(f"**Análisis de la Hoja de Vida**:\n\n{event['text']}")
+                else:
+                    verdict_area.success(f"**Conclusión Final**:\n\n{event['text']}")
+            elif event["type"] == "error":
+                status.empty()
+                raise RuntimeError(event["error"])
+            elif event["type"] == "done":
+                status.empty()
+                return event["result"]
+        
+        # Redraw streamed text at most once per refresh interval
+        if time.time() - last_draw >= refresh_interval:
+            last_draw = time.time()
+            if buffers["analysis"] and "analysis" not in finished:
+                analysis_area.markdown(f"**Análisis en curso**:\n\n{buffers['analysis']}")
+            if buffers["evaluation"] and "evaluation" not in finished:
+                verdict_area.markdown(f"**Evaluación en curso**:\n\n{buffers['evaluation']}")
@@ -2,59 +2,238 @@
 Utility functions for CV Analyzer.
 """
 
-import os
 import io
-import shutil
+import hashlib
 import logging
-from typing import List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import fitz
 from PIL import Image
 
-from config import DOCS_FOLDER
+from metrics import span
+from config import (
+    PREVIEW_THUMBNAIL_SCALE,
+    PREVIEW_FORMAT,
+    PREVIEW_QUALITY,
+    PREVIEW_WORKERS,
+    PREVIEW_CACHE_MAX_BYTES,
+)
 
-def setup_folders():
-    """Ensure necessary folders exist"""
-    if not os.path.exists(DOCS_FOLDER):
-        os.makedirs(DOCS_FOLDER)
-        logging.info(f"Created folder: {DOCS_FOLDER}")
+# A PDF given by its path or, for in-memory uploads, by its bytes
+PdfSource = Union[str, bytes]
 
-def delete_docs(folder):
+# Heading keywords (Spanish and English) that start each CV section
+CV_SECTION_KEYWORDS = {
+    "perfil": ("perfil", "resumen", "sobre mí", "acerca de", "profile", "summary", "about"),
+    "experiencia": ("experiencia", "historial laboral", "trayectoria", "experience", "work history", "employment"),
+    "educación": ("educación", "formación", "estudios", "education", "academic"),
+    "habilidades": ("habilidades", "competencias", "conocimientos", "aptitudes", "skills", "technical skills"),
+    "idiomas": ("idiomas", "languages"),
+    "certificaciones": ("certificaciones", "certificados", "cursos", "certifications", "courses"),
+    "proyectos": ("proyectos", "projects", "portafolio", "portfolio"),
+}
+
+# Rendered preview pages keyed by (file hash, page, scale, format, quality)
+_preview_cache = OrderedDict()
+_preview_cache_bytes = 0
+_preview_executor = None
+_preview_lock = threading.Lock()
+
+def compute_file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
     """
-    Clean up document folder
+    Compute the SHA-256 digest of a file's content.
     
     Args:
-        folder (str): Path to the folder to clean
+        path: Path to the file
+        chunk_size: Number of bytes read per iteration
+        
+    Returns:
+        Hex-encoded SHA-256 digest
     """
-    if os.path.exists(folder):
-        try:
-            shutil.rmtree(folder)
-            os.makedirs(folder)
-            logging.info(f"Cleaned up folder: {folder}")
-        except Exception as e:
-            logging.error(f"Error cleaning up folder {folder}: {e}")
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def get_pdf_previews(pdf_path: str, scale: float = 2.0) -> List[Image.Image]:
+def compute_pdf_hash(pdf: PdfSource) -> str:
     """
-    Generate preview images for all pages in a PDF.
+    Compute the SHA-256 digest of a PDF given by path or bytes.
     
     Args:
-        pdf_path: Path to the PDF file
-        scale: Image scale factor for resolution adjustment
+        pdf: Path to the PDF file or its bytes
         
     Returns:
-        List of PIL Image objects
+        Hex-encoded SHA-256 digest
+    """
+    if isinstance(pdf, bytes):
+        return hashlib.sha256(pdf).hexdigest()
+    return compute_file_hash(pdf)
+
+def open_pdf(pdf: PdfSource) -> fitz.Document:
+    """Open a PDF from a path, or from memory without touching the disk"""
+    if isinstance(pdf, bytes):
+        return fitz.open(stream=pdf, filetype="pdf")
+    return fitz.open(pdf)
+
+def describe_pdf(pdf: PdfSource) -> str:
+    """Short description of a PDF source for log messages"""
+    return f"<in-memory PDF, {len(pdf)} bytes>" if isinstance(pdf, bytes) else pdf
+
+def get_pdf_page_count(pdf: PdfSource) -> int:
+    """
+    Count the pages of a PDF without rendering them.
+    
+    Args:
+        pdf: Path to the PDF file or its bytes
+        
+    Returns:
+        Number of pages, or 0 if the file cannot be opened
     """
     try:
-        doc = fitz.open(pdf_path)
-        previews = []
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
-            img = Image.open(io.BytesIO(pix.tobytes()))
-            previews.append(img)
-        logging.info(f"Generated {len(previews)} preview images for {pdf_path}")
-        return previews
+        with open_pdf(pdf) as doc:
+            return doc.page_count
     except Exception as e:
-        logging.error(f"Error generating PDF previews for {pdf_path}: {e}")
-        return []
+        logging.error(f"Error reading page count for {describe_pdf(pdf)}: {e}")
+        return 0
+
+def detect_section_heading(line: str) -> Optional[str]:
+    """
+    Map a CV line to a section name if it looks like a heading.
+    
+    Args:
+        line: Whitespace-normalized line of text
+        
+    Returns:
+        Section name, or None if the line is not a heading
+    """
+    if len(line) > 40 or len(line.split()) > 4 or any(char.isdigit() for char in line):
+        return None
+    normalized = line.strip(" :•-").casefold()
+    for section, keywords in CV_SECTION_KEYWORDS.items():
+        if any(normalized.startswith(keyword) for keyword in keywords):
+            return section
+    return None
+
+def format_cv_sections(sections: Dict[str, str]) -> str:
+    """Render CV sections as Markdown-like text for the analysis prompt"""
+    return "\n\n".join(f"## {name.capitalize()}\n{body}" for name, body in sections.items() if body)
+
+def _render_page(pdf: PdfSource, page_num: int, scale: float, image_format: str, quality: int) -> bytes:
+    """Render one PDF page and encode it; each call opens its own document so it is thread-safe"""
+    with span("preview_page", page=page_num, scale=scale, format=image_format) as attributes:
+        with open_pdf(pdf) as doc:
+            pix = doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        buffer = io.BytesIO()
+        if image_format == "PNG":
+            img.save(buffer, format="PNG", optimize=True)
+        else:
+            img.save(buffer, format=image_format, quality=quality)
+        attributes["bytes"] = buffer.tell()
+        return buffer.getvalue()
+
+def _get_preview_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for page rendering, created on first use"""
+    global _preview_executor
+    with _preview_lock:
+        if _preview_executor is None:
+            _preview_executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix="pdf-preview")
+        return _preview_executor
+
+def _cache_preview(key: tuple, data: bytes):
+    """Store a rendered page, evicting least recently used pages over the byte budget"""
+    global _preview_cache_bytes
+    with _preview_lock:
+        if key in _preview_cache:
+            return
+        _preview_cache[key] = data
+        _preview_cache_bytes += len(data)
+        while _preview_cache_bytes > PREVIEW_CACHE_MAX_BYTES and len(_preview_cache) > 1:
+            _, evicted = _preview_cache.popitem(last=False)
+            _preview_cache_bytes -= len(evicted)
+
+def _get_cached_preview(key: tuple) -> Optional[bytes]:
+    """Look up a rendered page and mark it as recently used"""
+    with _preview_lock:
+        data = _preview_cache.get(key)
+        if data is not None:
+            _preview_cache.move_to_end(key)
+        return data
+
+def clear_preview_cache():
+    """Drop all cached preview pages"""
+    global _preview_cache_bytes
+    with _preview_lock:
+        _preview_cache.clear()
+        _preview_cache_bytes = 0
+
+def iter_pdf_previews(
+    pdf: PdfSource,
+    scale: float = PREVIEW_THUMBNAIL_SCALE,
+    start: int = 0,
+    count: Optional[int] = None,
+    image_format: str = PREVIEW_FORMAT,
+    quality: int = PREVIEW_QUALITY,
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Lazily render a range of PDF pages as encoded preview images.
+    
+    Pages are rendered in a thread pool and cached by file content hash, so
+    Streamlit reruns on the same document never render a page twice.
+    
+    Args:
+        pdf: Path to the PDF file or its bytes
+        scale: Image scale factor for resolution adjustment
+        start: Index of the first page to render
+        count: Maximum number of pages to render; all remaining pages if None
+        image_format: Encoding of the images (JPEG, WEBP or PNG)
+        quality: Encoder quality for lossy formats
+        
+    Yields:
+        Tuples of page index and encoded image bytes, in page order
+    """
+    try:
+        file_hash = compute_pdf_hash(pdf)
+        page_count = get_pdf_page_count(pdf)
+        stop = page_count if count is None else min(page_count, start + count)
+        executor = _get_preview_executor()
+        pending = []
+        for page_num in range(start, stop):
+            key = (file_hash, page_num, scale, image_format, quality)
+            cached = _get_cached_preview(key)
+            if cached is not None:
+                pending.append((page_num, key, cached))
+            else:
+                future = executor.submit(_render_page, pdf, page_num, scale, image_format, quality)
+                pending.append((page_num, key, future))
+        for page_num, key, item in pending:
+            if isinstance(item, bytes):
+                yield page_num, item
+                continue
+            data = item.result()
+            _cache_preview(key, data)
+            yield page_num, data
+    except Exception as e:
+        logging.error(f"Error generating PDF previews for {describe_pdf(pdf)}: {e}")
+
+def get_pdf_previews(pdf: PdfSource, scale: float = PREVIEW_THUMBNAIL_SCALE,
+                     start: int = 0, count: Optional[int] = None) -> List[bytes]:
+    """
+    Generate preview images for a range of pages in a PDF.
+    
+    Args:
+        pdf: Path to the PDF file or its bytes
+        scale: Image scale factor for resolution adjustment
+        start: Index of the first page to render
+        count: Maximum number of pages to render; all remaining pages if None
+        
+    Returns:
+        List of encoded image bytes
+    """
+    previews = [img for _, img in iter_pdf_previews(pdf, scale=scale, start=start, count=count)]
+    logging.info(f"Generated {len(previews)} preview images for {describe_pdf(pdf)}")
+    return previews
@@ -0,0 +1,347 @@
+"""
+Vacancy requirement index and vector pre-ranking of candidates.
+
+The requirements text is split into individual criteria that are embedded
+once into a persistent Chroma collection, and each CV is chunked and embedded
+once into another. Scoring a CV is then a nearest-chunk query per criterion,
+which gives a cheap ranking and the evidence behind each criterion before any
+LLM call is made.
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from config import (
+    init_chroma,
+    EMBEDDING_MODEL_NAME,
+    VACANCY_INDEX_DIR,
+    PRERANK_CHUNK_CHARS,
+    PRERANK_MATCH_THRESHOLD,
+    PRERANK_MISS_THRESHOLD,
+)
+from llm import embed_texts
+from metrics import span
+from result_cache import normalize_descripcion
+from extraction import chunk_section_lines, iter_cv_chunks
+from utils import PdfSource, compute_pdf_hash, describe_pdf
+
+# Criteria are separated by lines, bullets, semicolons or sentences
+CRITERION_SEPARATOR = re.compile(r"\n|;|•|(?<=[.!?])\s+(?=[¿¡A-ZÁÉÍÓÚÑ])")
+# Within a sentence, commas separate criteria unless they list alternatives,
+# e.g. "experiencia con Python, Java o Go" or "Ingeniería o afines"
+ENUMERATION_SEPARATOR = re.compile(r",\s+")
+ALTERNATIVE_JOINER = re.compile(r"\s(?:o|u|ó)\s", re.IGNORECASE)
+BULLET_PREFIX = re.compile(r"^(?:[-*·]|\d+[.)])\s*")
+# Trailing fillers of enumerations that are not criteria themselves
+FILLER_PHRASES = {"etc", "entre otros", "entre otras", "otros", "etc."}
+
+MET = "met"
+MISSING = "missing"
+AMBIGUOUS = "ambiguous"
+
+def _is_alternative(piece: str) -> bool:
+    """Whether a comma-separated piece closes a list of alternatives, such as Java o Go"""
+    return len(piece.split()) <= 3 and bool(ALTERNATIVE_JOINER.search(f" {piece} "))
+
+def split_enumeration(sentence: str) -> List[str]:
+    """
+    Split a sentence on commas, keeping lists of alternatives together.
+
+    A piece is joined to the previous one when it closes a list of
+    alternatives, or is a single word followed by more items of that list,
+    so "Python, Java, Scala o Go" stays whole while "Python y R, SQL
+    avanzado" gives two criteria.
+
+    Args:
+        sentence: One sentence or line of the requirements
+
+    Returns:
+        Comma-separated pieces with alternatives re-joined
+    """
+    pieces = ENUMERATION_SEPARATOR.split(sentence)
+    merged: List[str] = []
+    for i, piece in enumerate(pieces):
+        # Single words up to the closing alternative belong to the same list
+        rest = pieces[i:]
+        closing = next((j for j, item in enumerate(rest) if len(item.split()) > 1 or _is_alternative(item)), None)
+        continues = closing is not None and _is_alternative(rest[closing])
+        if merged and continues:
+            merged[-1] = f"{merged[-1]}, {piece}"
+        else:
+            merged.append(piece)
+    return merged
+
+def parse_requirements(descripcion: str) -> List[str]:
+    """
+    Split the requirements text into individual criteria.
+
+    Args:
+        descripcion: Requirements text for the vacancy
+
+    Returns:
+        Criteria in their original order, without duplicates; the whole text
+        as a single criterion if it has no separate ones
+    """
+    criteria = []
+    seen = set()
+    pieces = [piece for sentence in CRITERION_SEPARATOR.split(descripcion) for piece in split_enumeration(sentence)]
+    for piece in pieces:
+        criterion = BULLET_PREFIX.sub("", " ".join(piece.split())).strip(" .:")
+        # Short criteria such as "R" or "Go" are kept
+        normalized = normalize_descripcion(criterion)
+        if not criterion or normalized in FILLER_PHRASES or normalized in seen:
+            continue
+        seen.add(normalized)
+        criteria.append(criterion)
+    if not criteria and descripcion.strip():
+        return [" ".join(descripcion.split())]
+    return criteria
+
+def criterion_hash(criterion: str) -> str:
+    """
+    Content hash of a criterion, insensitive to case and spacing.
+
+    Args:
+        criterion: Criterion text
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    return hashlib.sha256(normalize_descripcion(criterion).encode("utf-8")).hexdigest()
+
+def chunk_cv_sections(sections: Dict[str, str], max_chars: int = PRERANK_CHUNK_CHARS) -> List[Dict[str, str]]:
+    """
+    Split CV sections into section-aware chunks for embedding.
+
+    Args:
+        sections: Ordered mapping of section name to text
+        max_chars: Maximum characters per chunk
+
+    Returns:
+        Chunks as dictionaries with "section" and "text"
+    """
+    lines = ((section, line) for section, body in sections.items() for line in body.splitlines())
+    return list(chunk_section_lines(lines, max_chars))
+
+def classify_similarity(similarity: float) -> str:
+    """Map a criterion's best similarity to met, missing or ambiguous"""
+    if similarity >= PRERANK_MATCH_THRESHOLD:
+        return MET
+    if similarity < PRERANK_MISS_THRESHOLD:
+        return MISSING
+    return AMBIGUOUS
+
+class VacancyIndex:
+    """
+    Persistent embeddings of requirement criteria and CV chunks.
+
+    Criteria are keyed by their content hash, so a criterion shared by several
+    vacancies, or kept when the requirements are edited, is embedded only once.
+    CV chunks are keyed by the CV content hash.
+    """
+
+    def __init__(self, path: str = VACANCY_INDEX_DIR, embedding_model: str = EMBEDDING_MODEL_NAME):
+        import chromadb
+        from chromadb.config import Settings
+        init_chroma()
+
+        suffix = hashlib.sha256(embedding_model.encode("utf-8")).hexdigest()[:12]
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        self._criteria = client.get_or_create_collection(f"criteria-{suffix}", metadata={"hnsw:space": "cosine"})
+        self._chunks = client.get_or_create_collection(f"cv-chunks-{suffix}", metadata={"hnsw:space": "cosine"})
+        self._lock = threading.Lock()
+
+    def add_criteria(self, criteria: List[str]) -> List[List[float]]:
+        """
+        Embed the criteria missing from the index.
+
+        Args:
+            criteria: Criterion texts
+
+        Returns:
+            Embedding of each criterion, in input order
+        """
+        ids = [criterion_hash(criterion) for criterion in criteria]
+        with self._lock:
+            existing = self._criteria.get(ids=ids, include=["embeddings"])
+            embeddings = dict(zip(existing["ids"], existing["embeddings"]))
+            missing = [(id_, criterion) for id_, criterion in zip(ids, criteria) if id_ not in embeddings]
+            if missing:
+                texts = [criterion for _, criterion in missing]
+                new_embeddings = embed_texts(texts)
+                self._criteria.add(
+                    ids=[id_ for id_, _ in missing],
+                    embeddings=new_embeddings,
+                    documents=texts,
+                )
+                embeddings.update(zip((id_ for id_, _ in missing), new_embeddings))
+        logging.info(f"Vacancy index: {len(criteria) - len(missing)} criteria reused, {len(missing)} embedded")
+        return [list(embeddings[id_]) for id_ in ids]
+
+    def count_cv_chunks(self, cv_hash: str) -> int:
+        """Number of chunks indexed for a CV, 0 if it is not indexed"""
+        with self._lock:
+            return len(self._chunks.get(where={"cv_hash": cv_hash}, include=[])["ids"])
+
+    def add_cv(self, cv_hash: str, chunks: Iterable[Dict[str, str]],
+               batch_size: int = 100) -> int:
+        """
+        Embed a CV's chunks unless they are already indexed.
+
+        Chunks are embedded in batches as they arrive, so a CV streamed from
+        page extraction is embedded while its later pages are still being
+        read. They are written in a single add once all are embedded, so a
+        failure midway leaves no partial index that would be taken as complete.
+
+        Args:
+            cv_hash: SHA-256 digest of the CV PDF content
+            chunks: Section-aware chunks of the CV, e.g. from iter_cv_chunks
+            batch_size: Chunks embedded per request
+
+        Returns:
+            Number of chunks indexed for the CV
+        """
+        with self._lock:
+            existing = self._chunks.get(where={"cv_hash": cv_hash}, include=[])
+            if existing["ids"]:
+                return len(existing["ids"])
+            embedded: List[Dict[str, str]] = []
+            embeddings: List[List[float]] = []
+            batch: List[Dict[str, str]] = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    embeddings.extend(embed_texts([item["text"] for item in batch]))
+                    embedded.extend(batch)
+                    batch = []
+            if batch:
+                embeddings.extend(embed_texts([item["text"] for item in batch]))
+                embedded.extend(batch)
+            if not embedded:
+                return 0
+            self._chunks.add(
+                ids=[f"{cv_hash}:{i}" for i in range(len(embedded))],
+                embeddings=embeddings,
+                documents=[chunk["text"] for chunk in embedded],
+                metadatas=[{"cv_hash": cv_hash, "section": chunk["section"]} for chunk in embedded],
+            )
+            return len(embedded)
+
+    def score_cv(self, cv_hash: str, criteria: List[str], criterion_embeddings: List[List[float]]) -> List[dict]:
+        """
+        Find the CV chunk closest to each criterion.
+
+        Args:
+            cv_hash: SHA-256 digest of an indexed CV
+            criteria: Criterion texts
+            criterion_embeddings: Embedding of each criterion
+
+        Returns:
+            Per-criterion similarity, status and evidence chunk
+        """
+        with self._lock:
+            result = self._chunks.query(
+                query_embeddings=criterion_embeddings,
+                n_results=1,
+                where={"cv_hash": cv_hash},
+                include=["documents", "distances"],
+            )
+        scores = []
+        for criterion, documents, distances in zip(criteria, result["documents"], result["distances"]):
+            # Cosine distance in Chroma is 1 - cosine similarity
+            similarity = round(1 - distances[0], 4) if distances else 0.0
+            scores.append({
+                "criterion": criterion,
+                "similarity": similarity,
+                "status": classify_similarity(similarity),
+                "evidence": documents[0] if documents else "",
+            })
+        return scores
+
+_vacancy_index: Optional[VacancyIndex] = None
+_vacancy_index_lock = threading.Lock()
+
+def get_vacancy_index() -> VacancyIndex:
+    """The process-wide vacancy index, created on first use"""
+    global _vacancy_index
+    with _vacancy_index_lock:
+        if _vacancy_index is None:
+            _vacancy_index = VacancyIndex()
+        return _vacancy_index
+
+def prerank_cvs(cvs: List[PdfSource], descripcion: str) -> List[dict]:
+    """
+    Rank CVs against a vacancy by embedding similarity, without LLM calls.
+
+    A CV's score is the mean of its best similarity per criterion. CVs without
+    a text layer cannot be scored and are ranked last with a score of None.
+
+    Args:
+        cvs: Paths to the CV PDF files or their bytes
+        descripcion: Requirements text for the vacancy
+
+    Returns:
+        Ranking entries with the CV source, hash, score and per-criterion evidence,
+        best first
+    """
+    index = get_vacancy_index()
+    criteria = parse_requirements(descripcion)
+    if not criteria:
+        raise ValueError("No se encontraron requisitos en la descripción del perfil")
+    with span("vacancy_index", criteria=len(criteria)):
+        criterion_embeddings = index.add_criteria(criteria)
+
+    ranking = []
+    for cv in cvs:
+        with span("prerank_cv"):
+            cv_hash = compute_pdf_hash(cv)
+            entry = {"cv": cv, "cv_hash": cv_hash, "score": None, "criteria": []}
+            try:
+                # Pages are only extracted for CVs that are not indexed yet
+                indexed = index.count_cv_chunks(cv_hash) or index.add_cv(
+                    cv_hash, iter_cv_chunks(cv, PRERANK_CHUNK_CHARS)
+                )
+                if indexed:
+                    entry["criteria"] = index.score_cv(cv_hash, criteria, criterion_embeddings)
+                    entry["score"] = round(
+                        sum(item["similarity"] for item in entry["criteria"]) / len(criteria), 4
+                    )
+            except Exception as e:
+                logging.error(f"Error pre-ranking CV {describe_pdf(cv)}: {e}")
+        ranking.append(entry)
+
+    ranking.sort(key=lambda entry: -1.0 if entry["score"] is None else entry["score"], reverse=True)
+    for rank, entry in enumerate(ranking, start=1):
+        entry["rank"] = rank
+    return ranking
+
+def select_for_crew(ranking: List[dict], top_n: int) -> List[dict]:
+    """
+    Choose the candidates that deserve a full crew analysis.
+
+    The top N candidates are always selected. Below them, a candidate is still
+    selected when no criterion is clearly missing, because its ambiguous
+    criteria can only be settled by the crew. CVs that could not be scored
+    are always selected.
+
+    Args:
+        ranking: Output of prerank_cvs
+        top_n: Number of best ranked candidates to analyze
+
+    Returns:
+        Selected ranking entries, in ranking order
+    """
+    selected = []
+    for entry in ranking:
+        if entry["rank"] <= top_n or entry["score"] is None:
+            selected.append(entry)
+        elif all(item["status"] != MISSING for item in entry["criteria"]):
+            selected.append(entry)
+    return selected
+
+def missing_criteria(entry: dict) -> List[str]:
+    """Criteria with no supporting evidence in a ranked CV"""
+    return [item["criterion"] for item in entry["criteria"] if item["status"] == MISSING]